@@ -0,0 +1,225 @@
+"""
+Activity recording shared by :func:`accounts.utils.create_action` and
+:class:`accounts.activity_recorder_mixin.RecordsActivityMixin`.
+
+The same user, verb and target are recorded at most once per
+``ACCOUNTS_ACTIVITY_DEDUPE_WINDOW`` seconds. The window is claimed with an
+atomic cache add so recording costs no read query, deployments without a
+shared cache set ``ACCOUNTS_ACTIVITY_DEDUPE = 'db'`` to look the window up
+in the activity table instead. Inside a transaction the window is claimed
+once it commits, a rolled back activity can be recorded again right away.
+
+With ``ACCOUNTS_ACTIVITY_BUFFER = True`` records are collected per process
+and written with one bulk_create once ``ACCOUNTS_ACTIVITY_BUFFER_SIZE``
+are waiting or ``ACCOUNTS_ACTIVITY_BUFFER_INTERVAL`` seconds after the
+first one, the rest is written when the worker exits. A full buffer is
+written once the transaction of the request that filled it commits.
+Buffered records are written outside the request transaction and aren't
+seen by the ``'db'`` dedupe lookup until flushed.
+"""
+import atexit
+import datetime
+import hashlib
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .models import Activity
+
+CACHE_ALIAS = getattr(settings, 'ACCOUNTS_ACTIVITY_CACHE_ALIAS', 'default')
+DEDUPE_WINDOW = getattr(settings, 'ACCOUNTS_ACTIVITY_DEDUPE_WINDOW', 60)
+KEY_PREFIX = 'accounts:activity:'
+
+logger = logging.getLogger(__name__)
+
+
+def _dedupe_key(user_id, verb, target_ct_id, target_id):
+    # verbs are free text, hashed to stay a valid memcached key
+    digest = hashlib.sha1(verb.encode('utf-8')).hexdigest()
+    return '{}{}:{}:{}:{}'.format(KEY_PREFIX, user_id, digest, target_ct_id or '', target_id or '')
+
+
+def use_cache():
+    """
+    :returns False when the window has to be looked up in the database
+    """
+    if getattr(settings, 'ACCOUNTS_ACTIVITY_DEDUPE', 'cache') == 'db':
+        return False
+    return not isinstance(caches[CACHE_ALIAS], DummyCache)
+
+
+def _recorded_recently(user_id, verb, target_ct_id, target_id):
+    since = timezone.now() - datetime.timedelta(seconds=DEDUPE_WINDOW)
+    return Activity.objects.filter(user_id=user_id, verb=verb, target_ct_id=target_ct_id,
+                                   target_id=target_id, created__gte=since).exists()
+
+
+def record_activity(user, verb, target=None):
+    """
+    Record the activity unless the same one was recorded within the window
+
+    :param user: user object
+    :param verb: string describing the action
+    :param target: model instance the action refers to, defaults to None
+    :returns True if the activity was recorded
+    """
+    target_ct_id = target_id = None
+    if target is not None:
+        target_ct_id = ContentType.objects.get_for_model(target).pk
+        target_id = target.pk
+
+    activity = Activity(user=user, verb=verb, target_ct_id=target_ct_id, target_id=target_id,
+                        created=timezone.now())
+    if not use_cache():
+        if _recorded_recently(user.pk, verb, target_ct_id, target_id):
+            return False
+        _write(activity)
+        return True
+
+    cache = caches[CACHE_ALIAS]
+    key = _dedupe_key(user.pk, verb, target_ct_id, target_id)
+    if _in_transaction():
+        if cache.get(key) is not None:
+            return False
+        _write(activity)
+        transaction.on_commit(lambda: cache.add(key, 1, DEDUPE_WINDOW))
+        return True
+    if not cache.add(key, 1, DEDUPE_WINDOW):
+        return False
+    try:
+        _write(activity)
+    except Exception:
+        # let the next attempt record it
+        cache.delete(key)
+        raise
+    return True
+
+
+def _in_transaction():
+    # buffered activities are written outside of it anyway
+    if getattr(settings, 'ACCOUNTS_ACTIVITY_BUFFER', False):
+        return False
+    return transaction.get_connection().in_atomic_block
+
+
+def _write(activity):
+    if getattr(settings, 'ACCOUNTS_ACTIVITY_BUFFER', False):
+        get_activity_buffer().add(activity)
+    else:
+        activity.save()
+
+
+class ActivityBuffer(object):
+    """
+    Collects unsaved Activity objects and writes them with bulk_create
+    """
+    def __init__(self, size, interval):
+        self.size = size
+        self.interval = interval
+        self.activities = []
+        self.started = None
+        self.timer = None
+        self._lock = threading.Lock()
+
+    def add(self, activity):
+        with self._lock:
+            self.activities.append(activity)
+            if self.started is None:
+                self.started = time.monotonic()
+            full = len(self.activities) >= self.size
+            if not full and self.timer is None:
+                self.timer = threading.Timer(self.interval, self._flush_in_thread)
+                self.timer.daemon = True
+                self.timer.start()
+        if full:
+            # the batch holds other requests' activities, a rollback of
+            # this request must not take them along
+            transaction.on_commit(self.flush)
+
+    def is_due(self):
+        started = self.started
+        return started is not None and time.monotonic() - started >= self.interval
+
+    def flush(self):
+        """
+        Write the buffered activities in the calling thread
+
+        :returns number of activities written
+        """
+        with self._lock:
+            batch, self.activities = self.activities, []
+            self.started = None
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        if not batch:
+            return 0
+        try:
+            with transaction.atomic():
+                Activity.objects.bulk_create(batch, batch_size=self.size)
+        except Exception:
+            # one bad row (e.g. a user deleted meanwhile) must not drop the batch
+            logger.exception('Bulk insert of %d activities failed, saving one by one', len(batch))
+            return self._save_each(batch)
+        return len(batch)
+
+    @staticmethod
+    def _save_each(batch):
+        saved = 0
+        for activity in batch:
+            try:
+                with transaction.atomic():
+                    activity.save()
+            except Exception:
+                logger.exception('Dropped activity %r of user %s', activity.verb, activity.user_id)
+            else:
+                saved += 1
+        return saved
+
+    def _flush_in_thread(self):
+        try:
+            self.flush()
+        finally:
+            # the timer thread ends here, its connections would never be reused
+            connections.close_all()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_activity_buffer():
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = ActivityBuffer(getattr(settings, 'ACCOUNTS_ACTIVITY_BUFFER_SIZE', 100),
+                                         getattr(settings, 'ACCOUNTS_ACTIVITY_BUFFER_INTERVAL', 5))
+                atexit.register(_buffer.flush)
+    return _buffer
+
+
+def flush_activity_buffer():
+    """
+    Write pending activities now, for tests and shutdown hooks
+
+    :returns number of activities written
+    """
+    if _buffer is None:
+        return 0
+    return _buffer.flush()
+
+
+def flush_due_activities(sender=None, **kwargs):
+    """
+    request_finished receiver, writes the buffer once its interval passed
+    """
+    if _buffer is not None and _buffer.is_due():
+        _buffer.flush()
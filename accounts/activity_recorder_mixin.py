@@ -1,8 +1,4 @@
-import datetime
-
-from django.contrib.contenttypes.models import ContentType
-from django.utils import timezone
-from .models import Activity
+from .activity import record_activity
 
 
 class RecordsActivityMixin:
@@ -20,19 +16,4 @@ class RecordsActivityMixin:
 
     @staticmethod
     def create_action(user, verb, target=None):
-        now = timezone.now()
-        last_minute = now - datetime.timedelta(seconds=60)
-        similar_actions = Activity.objects.filter(user_id=user.id,
-                                                  verb=verb,
-                                                  created__gte=last_minute)
-        if target:
-            target_ct = ContentType.objects.get_for_model(target)
-            similar_actions = similar_actions.filter(target_ct=target_ct,
-                                                     target_id=target.id)
-
-        if not similar_actions:
-            # no existing actions found
-            activity = Activity(user=user, verb=verb, target=target)
-            activity.save()
-            return True
-        return False
+        return record_activity(user, verb, target)
@@ -1,9 +1,16 @@
 from django.contrib.humanize.templatetags.humanize import naturaltime
-from .models import User, Profile, Device, Activity
+from .admin_filters import AutocompleteFilter, AutocompleteFilterMixin
+from .pagination import EstimatedCountPaginator
+from .models import User, Profile, Device, Activity, ActivityRollup, QueuedEmail
+from .sessions import revoke_sessions
+from .user_cache import invalidate_users
 from django.contrib.auth.admin import UserAdmin
 from django.utils.translation import gettext, gettext_lazy as _
 from django.contrib import admin
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.admin.models import LogEntry, DELETION
+from django.contrib.admin.views.main import ChangeList
 from django.utils.html import escape
 from django.urls import reverse
 from django.utils.safestring import mark_safe
@@ -11,18 +18,46 @@ from django.utils.safestring import mark_safe
 
 class ProfileAdmin(admin.TabularInline):
     model = Profile
-    readonly_fields = ('temp_token',)
 
 
-class DeviceAdmin(admin.ModelAdmin, admin.RelatedFieldListFilter):
+class DeviceAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     model = Device
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     list_display = ('user', 'ip', 'machine', 'location', 'operating_system')
-    list_filter = ('user', 'machine', 'location',)
+    list_filter = (('user', AutocompleteFilter), ('machine', AutocompleteFilter), ('location', AutocompleteFilter))
+    list_select_related = ('user',)
 
 
 admin.site.register(Device, DeviceAdmin)
 
 
+def _count(queryset):
+    return queryset.order_by().values('user').annotate(total=Count('pk')).values('total')
+
+
+_devices = Device.objects.filter(user=OuterRef('pk'))
+# user changelist columns, correlated subqueries so a page is one query
+# however many devices and activities its users have
+USER_COLUMNS = {
+    'profile_email_verified': F('profile__email_verified'),
+    'profile_phone_verified': F('profile__phone_verified'),
+    'last_device_location': Subquery(_devices.order_by('-created').values('location')[:1]),
+    'device_total': Coalesce(Subquery(_count(_devices)), 0),
+    'activity_total': Coalesce(Subquery(_count(Activity.objects.filter(user=OuterRef('pk')))), 0),
+}
+
+
+class UserChangeList(ChangeList):
+    def get_results(self, request):
+        """
+        Annotate the displayed page only, the paginator counts
+        the plain queryset and other admin views never see the columns
+        """
+        super().get_results(request)
+        self.result_list = self.result_list.annotate(**USER_COLUMNS)
+
+
 class DeviceInlineAdmin(admin.TabularInline):
     model = Device
     verbose_name = 'Active Device'
@@ -32,10 +67,10 @@ class DeviceInlineAdmin(admin.TabularInline):
 
 class CustomUserAdmin(UserAdmin):
     list_display = ['username', 'email', 'email_verified', 'phone', 'phone_verified',
-                    'is_staff', 'is_superuser', 'is_active', 'last_login_location', 'last_login_at']
-    actions = ['suspend_account', 'activate_account']
+                    'is_staff', 'is_superuser', 'is_active', 'last_login_location', 'last_login_at',
+                    'device_count', 'activity_count']
+    actions = ['suspend_account', 'activate_account', 'logout_everywhere']
     inlines = (ProfileAdmin, DeviceInlineAdmin)
-    list_select_related = ['profile']
     fieldsets = (
         (None, {'fields': ('username', 'password')}),
         (_('Personal info'), {'fields': ('first_name', 'last_name', 'email', 'phone')}),
@@ -45,19 +80,35 @@ class CustomUserAdmin(UserAdmin):
     )
     list_filter = ('is_active', 'profile__email_verified')
 
+    def get_changelist(self, request, **kwargs):
+        return UserChangeList
+
     def phone_verified(self, obj):
-        return obj.profile.phone_verified
+        return obj.profile_phone_verified
 
     phone_verified.boolean = True
+    phone_verified.admin_order_field = USER_COLUMNS['profile_phone_verified']
 
     def email_verified(self, obj):
-        return obj.profile.email_verified
+        return obj.profile_email_verified
 
     email_verified.boolean = True
+    email_verified.admin_order_field = USER_COLUMNS['profile_email_verified']
 
-    @staticmethod
-    def last_login_location(obj):
-        return obj.device_set.latest('created').location
+    def last_login_location(self, obj):
+        return obj.last_device_location
+
+    last_login_location.admin_order_field = USER_COLUMNS['last_device_location']
+
+    def device_count(self, obj):
+        return obj.device_total
+
+    device_count.admin_order_field = USER_COLUMNS['device_total']
+
+    def activity_count(self, obj):
+        return obj.activity_total
+
+    activity_count.admin_order_field = USER_COLUMNS['activity_total']
 
     @staticmethod
     def last_login_at(obj):
@@ -65,12 +116,23 @@ class CustomUserAdmin(UserAdmin):
         return naturaltime(login_time)
 
     def suspend_account(self, request, queryset):
+        user_ids = list(queryset.values_list('pk', flat=True))
         queryset.update(is_active=False)
+        invalidate_users(user_ids)
+        revoked = revoke_sessions(user_ids)
+        self.message_user(request, 'Suspended {} accounts and ended {} sessions.'.format(len(user_ids), revoked))
 
     suspend_account.short_description = "Suspend user account"
 
+    def logout_everywhere(self, request, queryset):
+        revoked = revoke_sessions(queryset.values_list('pk', flat=True))
+        self.message_user(request, 'Ended {} sessions.'.format(revoked))
+
+    logout_everywhere.short_description = "Log out of all sessions"
+
     def activate_account(self, request, queryset):
         queryset.update(is_active=True)
+        invalidate_users(queryset.values_list('pk', flat=True))
 
     activate_account.short_description = "Activate user account"
 
@@ -81,24 +143,62 @@ admin.site.register(User, CustomUserAdmin)
 
 class ActivityAdmin(admin.ModelAdmin):
     model = Activity
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     list_display = ('user', 'verb', 'target', 'created')
     list_filter = ('created',)
+    list_select_related = ('user',)
     search_fields = ('verb',)
 
+    def get_queryset(self, request):
+        # targets are loaded with one query per content type on the page
+        return super().get_queryset(request).prefetch_related('target')
+
 
 admin.site.register(Activity, ActivityAdmin)
 
 
+class ActivityRollupAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
+    model = ActivityRollup
+    list_display = ('day', 'verb', 'user', 'count')
+    list_filter = (('verb', AutocompleteFilter),)
+    list_select_related = ('user',)
+    date_hierarchy = 'day'
+    search_fields = ('verb', 'user__username')
+    readonly_fields = ('day', 'verb', 'user', 'count')
+
+    def has_add_permission(self, request):
+        return False
+
+
+admin.site.register(ActivityRollup, ActivityRollupAdmin)
+
+
+class QueuedEmailAdmin(admin.ModelAdmin):
+    model = QueuedEmail
+    list_display = ('subject', 'to', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('to', 'subject')
+    readonly_fields = ('created', 'sent_at', 'last_error')
+
+
+admin.site.register(QueuedEmail, QueuedEmailAdmin)
+
+
 @admin.register(LogEntry)
-class LogEntryAdmin(admin.ModelAdmin):
+class LogEntryAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     date_hierarchy = 'action_time'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     list_filter = [
-        'user',
+        ('user', AutocompleteFilter),
         'content_type',
         'action_flag'
     ]
 
+    list_select_related = ['user', 'content_type']
+
     search_fields = [
         'object_repr',
         'change_message'
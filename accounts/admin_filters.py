@@ -0,0 +1,111 @@
+"""
+Admin list filters that ask for a value instead of listing every
+distinct one in the sidebar.
+
+.. code-block:: python
+
+    class DeviceAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
+        list_filter = (('user', AutocompleteFilter), ('location', AutocompleteFilter))
+
+Suggestions come from a JSON view added to the model admin, matching
+values by prefix and returning at most ``AutocompleteFilter.limit``.
+Relations to the user model are filtered by username, suggested from the
+user table itself, so users without related rows are listed too.
+"""
+from django.contrib import admin
+from django.contrib.admin.utils import get_fields_from_path
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, JsonResponse
+from django.urls import path, reverse
+
+
+def _related_value_field(field):
+    return getattr(field.related_model, 'USERNAME_FIELD', 'pk')
+
+
+def _value_path(field, field_path):
+    if field.is_relation:
+        return '{}__{}'.format(field_path, _related_value_field(field))
+    return field_path
+
+
+class AutocompleteFilter(admin.FieldListFilter):
+    template = 'admin/accounts/autocomplete_filter.html'
+    limit = 20
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.value_path = _value_path(field, field_path)
+        self.lookup_kwarg = '{}__exact'.format(self.value_path)
+        self.lookup_val = params.get(self.lookup_kwarg)
+        super().__init__(field, request, params, model, model_admin, field_path)
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def choices(self, changelist):
+        info = changelist.model._meta.app_label, changelist.model._meta.model_name
+        yield {
+            'selected': self.lookup_val is not None,
+            'value': self.lookup_val,
+            'parameter_name': self.lookup_kwarg,
+            'clear_query_string': changelist.get_query_string(remove=[self.lookup_kwarg]),
+            # keep the other filters and the search when a value is submitted
+            'hidden_params': [(key, value) for key, value in changelist.params.items()
+                              if key not in (self.lookup_kwarg, 'p')],
+            'autocomplete_url': '{}?field={}'.format(
+                reverse('admin:%s_%s_filter_autocomplete' % info), self.field_path),
+            'list_id': 'autocomplete-{}'.format(self.field_path),
+        }
+
+    @classmethod
+    def suggestions(cls, model, field_path, term):
+        """
+        :returns at most limit distinct values starting with the term
+        """
+        field = get_fields_from_path(model, field_path)[-1]
+        if field.is_relation:
+            # read the small related table instead of a DISTINCT over every row pointing to it
+            model, value_path = field.related_model, _related_value_field(field)
+            values = model._default_manager.order_by(value_path).values_list(value_path, flat=True)
+        else:
+            value_path = field_path
+            values = model._default_manager.order_by(value_path).values_list(value_path, flat=True).distinct()
+        if term:
+            values = values.filter(**{'{}__istartswith'.format(value_path): term})
+        return list(values[:cls.limit])
+
+
+class AutocompleteFilterMixin(object):
+    """
+    Adds the suggestions view used by the AutocompleteFilter entries of
+    list_filter
+    """
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return [
+            path('filter-autocomplete/', self.admin_site.admin_view(self.filter_autocomplete_view),
+                 name='%s_%s_filter_autocomplete' % info),
+        ] + super().get_urls()
+
+    def get_autocomplete_filters(self):
+        return {
+            entry[0]: entry[1] for entry in self.list_filter
+            if isinstance(entry, (list, tuple)) and issubclass(entry[1], AutocompleteFilter)
+        }
+
+    def lookup_allowed(self, lookup, value):
+        for field_path in self.get_autocomplete_filters():
+            field = get_fields_from_path(self.model, field_path)[-1]
+            if lookup == '{}__exact'.format(_value_path(field, field_path)):
+                return True
+        return super().lookup_allowed(lookup, value)
+
+    def filter_autocomplete_view(self, request):
+        if not self.has_view_or_change_permission(request):
+            raise PermissionDenied
+        field_path = request.GET.get('field')
+        filter_class = self.get_autocomplete_filters().get(field_path)
+        if filter_class is None:
+            raise Http404('No autocomplete filter for {}'.format(field_path))
+        term = request.GET.get('term', '').strip()
+        return JsonResponse({'results': filter_class.suggestions(self.model, field_path, term)})
@@ -0,0 +1,130 @@
+"""
+Retention for the activity table.
+
+``python manage.py archive_activity`` streams activities older than
+``ACCOUNTS_ACTIVITY_RETENTION_DAYS`` into a gzipped JSON lines file under
+``ACCOUNTS_ACTIVITY_ARCHIVE_PATH`` and deletes each chunk once it is
+written, ``python manage.py restore_activity`` loads such files back.
+Content types are stored by natural key so archives can be restored into
+another database.
+"""
+import datetime
+import gzip
+import json
+import os
+import zlib
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Activity
+
+BATCH_SIZE = 1000
+RETENTION_DAYS = getattr(settings, 'ACCOUNTS_ACTIVITY_RETENTION_DAYS', 90)
+ARCHIVE_PATH = getattr(settings, 'ACCOUNTS_ACTIVITY_ARCHIVE_PATH', 'activity-archive')
+
+FIELDS = ('id', 'user_id', 'verb', 'target_ct_id', 'target_id', 'created')
+
+
+def _content_type_keys():
+    return {ct.pk: ct.natural_key() for ct in ContentType.objects.all()}
+
+
+def _serialize(row, content_types):
+    target_ct = row['target_ct_id']
+    return json.dumps({
+        'id': row['id'],
+        'user_id': row['user_id'],
+        'verb': row['verb'],
+        'target_ct': list(content_types[target_ct]) if target_ct else None,
+        'target_id': row['target_id'],
+        'created': row['created'].isoformat(),
+    }) + '\n'
+
+
+def archive_activities(before, path=ARCHIVE_PATH, batch_size=BATCH_SIZE):
+    """
+    Move activities created before the cutoff into an archive file,
+    walking the table by id so each chunk is one indexed range read
+    followed by one bounded delete
+
+    :param before: aware datetime cutoff
+    :returns tuple of (archived count, archive filename or None)
+    """
+    queryset = Activity.objects.filter(created__lt=before).order_by('id').values(*FIELDS)
+    if not queryset.exists():
+        return 0, None
+
+    os.makedirs(path, exist_ok=True)
+    filename = os.path.join(path, 'activity-{}.jsonl.gz'.format(timezone.now().strftime('%Y%m%dT%H%M%S%f')))
+    content_types = _content_type_keys()
+    archived, last_id = 0, 0
+    with open(filename, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb') as stream:
+        while True:
+            rows = list(queryset.filter(id__gt=last_id)[:batch_size])
+            if not rows:
+                break
+            stream.write(''.join(_serialize(row, content_types) for row in rows).encode('utf-8'))
+            # rows are only deleted once they are on disk
+            stream.flush(zlib.Z_SYNC_FLUSH)
+            raw.flush()
+            os.fsync(raw.fileno())
+            ids = [row['id'] for row in rows]
+            Activity.objects.filter(id__in=ids).delete()
+            archived += len(rows)
+            last_id = ids[-1]
+            if len(rows) < batch_size:
+                break
+    return archived, filename
+
+
+def archive_expired(days=RETENTION_DAYS, **kwargs):
+    return archive_activities(timezone.now() - datetime.timedelta(days=days), **kwargs)
+
+
+def _read_lines(filename):
+    with gzip.open(filename, 'rt', encoding='utf-8') as stream:
+        try:
+            for line in stream:
+                if line.endswith('\n'):
+                    yield json.loads(line)
+        except EOFError:
+            # archive cut short by a crash, every flushed chunk is readable
+            return
+
+
+def restore_activities(filename, batch_size=BATCH_SIZE):
+    """
+    Load an archive back, rows that already exist are skipped
+
+    :returns number of rows read from the archive
+    """
+    content_types = {}
+    restored = 0
+    batch = []
+
+    def get_content_type(natural_key):
+        natural_key = tuple(natural_key)
+        if natural_key not in content_types:
+            content_types[natural_key] = ContentType.objects.get_by_natural_key(*natural_key).pk
+        return content_types[natural_key]
+
+    for row in _read_lines(filename):
+        batch.append(Activity(
+            id=row['id'],
+            user_id=row['user_id'],
+            verb=row['verb'],
+            target_ct_id=get_content_type(row['target_ct']) if row['target_ct'] else None,
+            target_id=row['target_id'],
+            created=parse_datetime(row['created']),
+        ))
+        if len(batch) >= batch_size:
+            Activity.objects.bulk_create(batch, ignore_conflicts=True)
+            restored += len(batch)
+            batch = []
+    if batch:
+        Activity.objects.bulk_create(batch, ignore_conflicts=True)
+        restored += len(batch)
+    return restored
@@ -0,0 +1,135 @@
+"""
+Async variants of the login, registration and activation views for ASGI
+deployments. Password hashing and direct SMTP sends run in a bounded
+thread pool so the event loop keeps serving while a login is being hashed,
+ORM calls go through sync_to_async as usual.
+
+Enabled by ``ACCOUNTS_ASYNC_VIEWS = True``, otherwise the urls keep the
+sync views from :mod:`accounts.views`.
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth import authenticate, get_user_model, login
+from django.contrib.auth.hashers import make_password
+from django.db import close_old_connections
+from django.shortcuts import redirect, render
+from django.utils.encoding import force_text
+from django.utils.http import urlsafe_base64_decode
+
+from .decorators import ratelimit, posted_identifier
+from .forms import AsyncLoginForm, UserRegistrationForm
+from .tokens import account_activation_token
+from .utils import send_verification_email, create_action
+from .views import LoginView, RegisterView
+
+User = get_user_model()
+
+MAX_WORKERS = getattr(settings, 'ACCOUNTS_ASYNC_MAX_WORKERS', 4)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='accounts')
+    return _executor
+
+
+def _run_job(func, *args, **kwargs):
+    try:
+        return func(*args, **kwargs)
+    finally:
+        # pool threads outlive requests, release what the job opened
+        close_old_connections()
+
+
+async def run_in_executor(func, *args, **kwargs):
+    """
+    Run a CPU or IO bound callable in the accounts thread pool
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(_run_job, func, *args, **kwargs))
+
+
+async def deliver_email(func, *args):
+    """
+    Queued emails are a single insert and go through the ORM, direct
+    SMTP sends run in the thread pool
+    """
+    if getattr(settings, 'ACCOUNTS_EMAIL_QUEUE', False):
+        return await sync_to_async(func)(*args)
+    return await run_in_executor(func, *args)
+
+
+@ratelimit('login', identifier=posted_identifier('username'))
+async def login_view(request, *args, **kwargs):
+    if request.method != 'POST':
+        return await sync_to_async(LoginView.as_view())(request, *args, **kwargs)
+
+    username = request.POST.get('username', '').strip()
+    # the backends hash in the pool so cheap requests keep being served
+    user = await run_in_executor(authenticate, request, username=username, password=request.POST.get('password'))
+    form = AsyncLoginForm(request.POST, request=request, authenticated_user=user)
+    if not await sync_to_async(form.is_valid)():
+        return await sync_to_async(render)(request, LoginView.template_name, {'form': form})
+
+    new_device = await sync_to_async(LoginView.login_user)(request, user)
+    if new_device:
+        await deliver_email(new_device.notify_user, request, new_device)
+        return redirect('auth:new_device')
+
+    return redirect(request.POST.get('next') or 'auth:profile')
+
+
+async def register_view(request, *args, **kwargs):
+    if request.method != 'POST':
+        return await sync_to_async(RegisterView.as_view())(request, *args, **kwargs)
+
+    user_form = UserRegistrationForm(request.POST)
+    if not await sync_to_async(user_form.is_valid)():
+        return await sync_to_async(render)(request, RegisterView.template_name, {'user_form': user_form})
+
+    new_user = user_form.save(commit=False)
+    new_user.is_active = False
+    new_user.password = await run_in_executor(make_password, user_form.cleaned_data['password'])
+    await sync_to_async(new_user.save)()
+    await deliver_email(send_verification_email, request, new_user)
+    messages.info(request, 'You have registered successfully, please check your email for activation link',
+                  extra_tags='info still')
+    await sync_to_async(create_action)(new_user, 'created account')
+    return await sync_to_async(render)(request, RegisterView.template_name, {'new_user': new_user}, status=201)
+
+
+@sync_to_async
+def _activate_user(request, user):
+    user.is_active = True
+    user.profile.email_verified = True
+    user.save()
+    login(request, user, backend=settings.AUTHENTICATION_BACKENDS[0])
+    create_action(user, 'Activated phone')
+
+
+async def activate_view(request, uidb64, token):
+    try:
+        uid = force_text(urlsafe_base64_decode(uidb64))
+        user = await sync_to_async(User.objects.select_related('profile').get)(pk=uid)
+    except (TypeError, ValueError, OverflowError, User.DoesNotExist):
+        user = None
+
+    if user is not None and account_activation_token.check_token(user, token):
+        await _activate_user(request, user)
+        messages.success(request, 'Thanks! %s Your account is active.' % user.username,
+                         extra_tags='success still')
+        return redirect('auth:profile')
+    else:
+        return await sync_to_async(render)(request, 'accounts/user/activation/invalid.html')
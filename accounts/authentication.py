@@ -1,4 +1,9 @@
 from django.contrib.auth import get_user_model
+from django.db.models import Q
+
+from .user_cache import get_cached_user
+from .utils import email_lookup_value, phone_lookup_value
+
 User = get_user_model()
 
 
@@ -7,19 +12,13 @@ class EmailAuthBackend(object):
     Authenticate using e-mail address.
     """
     def authenticate(self, requset, username=None, password=None):
-        try:
-            user = User.objects.get(email=username)
-            if user.check_password(password):
-                return user
-            return None
-        except User.DoesNotExist:
-            return None
+        user = User.objects.filter(email_lookup=email_lookup_value(username)).order_by('pk').first()
+        if user is not None and user.check_password(password):
+            return user
+        return None
 
     def get_user(self, user_id):
-        try:
-            return User.objects.get(pk=user_id)
-        except User.DoesNotExist:
-            return None
+        return get_cached_user(user_id)
 
 
 class PhoneAuthBackend(object):
@@ -28,9 +27,11 @@ class PhoneAuthBackend(object):
     """
 
     def authenticate(self, requset, username=None, password=None):
-        # if username.isdigit():
+        phone = phone_lookup_value(username)
+        if phone is None:
+            return None
         try:
-            user = User.objects.get(phone=username)
+            user = User.objects.get(phone=phone)
             if user.check_password(password):
                 return user
             return None
@@ -38,10 +39,7 @@ class PhoneAuthBackend(object):
             return None
 
     def get_user(self, user_id):
-        try:
-            return User.objects.get(pk=user_id)
-        except User.DoesNotExist:
-            return None
+        return get_cached_user(user_id)
 
 
 class UsernameAuthBackend(object):
@@ -61,7 +59,54 @@ class UsernameAuthBackend(object):
             return None
 
     def get_user(self, user_id):
-        try:
-            return User.objects.get(pk=user_id)
-        except User.DoesNotExist:
-            return None
\ No newline at end of file
+        return get_cached_user(user_id)
+
+class IdentifierAuthBackend(object):
+    """
+    Authenticate using username, e-mail address or phone number
+    in a single lookup.
+
+    The identifier type is worked out from its shape, an e-mail holds ``@``
+    and a phone number parses as a valid E.164 number, anything else is
+    treated as a username. Since usernames may legally contain ``@`` and
+    ``+`` the username column is matched in the same query as a fallback.
+    """
+
+    def authenticate(self, request, username=None, password=None):
+        if username is None or password is None:
+            return None
+        user = self.get_user_by_identifier(username)
+        if user is not None and user.check_password(password):
+            return user
+        return None
+
+    def get_user_by_identifier(self, identifier):
+        field, value = self.identify(identifier)
+        lookup = Q(username=identifier)
+        if field != 'username':
+            lookup |= Q(**{field: value})
+        # usernames and phones are unique but an e-mail may be shared, the
+        # oldest account owning it wins like in EmailAuthBackend. Ordered by
+        # pk, two rows always hold the oldest detected match and the
+        # username match, the detected column is preferred
+        candidates = list(User.objects.select_related('profile').filter(lookup).order_by('pk')[:2])
+        for user in candidates:
+            if str(getattr(user, field)) == str(value):
+                return user
+        return candidates[0] if candidates else None
+
+    @staticmethod
+    def identify(identifier):
+        """
+        :returns tuple of (field name, lookup value)
+        """
+        if '@' in identifier:
+            return 'email_lookup', email_lookup_value(identifier)
+        if identifier.startswith('+'):
+            phone = phone_lookup_value(identifier)
+            if phone is not None:
+                return 'phone', phone
+        return 'username', identifier
+
+    def get_user(self, user_id):
+        return get_cached_user(user_id)
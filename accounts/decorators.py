@@ -1,14 +1,18 @@
 
 
+import asyncio
 from functools import wraps
 
+from asgiref.sync import sync_to_async
 from django.contrib.auth import REDIRECT_FIELD_NAME
 from django.contrib.auth.decorators import user_passes_test
-from django.http import HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseRedirect
 from django.shortcuts import redirect
 from django.urls import reverse
-# from ratelimit.decorators import ratelimit
-# from accounts.utils import rate_limit_remote_user_header_key
+
+from .device_generator import get_ip
+from .ratelimit import is_rate_limited
+from .utils import phone_lookup_value
 
 def auth_guest(function=None, redirect_field_name=REDIRECT_FIELD_NAME, login_url=None):
     """
@@ -26,6 +30,59 @@ def auth_guest(function=None, redirect_field_name=REDIRECT_FIELD_NAME, login_url
     return actual_decorator
 
 
+def ratelimit(group, identifier=None, methods=('POST',)):
+    """
+    Decorator for views that rejects the request with 429 before the view
+    runs once the client IP or the identifier exceeds the group rates.
+
+    :param group: rates group name in ACCOUNTS_RATELIMITS
+    :param identifier: callable(request, *args, **kwargs) returning the
+        username, phone or user id being targeted
+    :param methods: request methods counted against the limit
+    """
+    def limited(request, *args, **kwargs):
+        if request.method not in methods:
+            return False
+        value = identifier(request, *args, **kwargs) if identifier else None
+        return is_rate_limited(group, get_ip(request), value)
+
+    def too_many_requests():
+        return HttpResponse('Too many attempts, please try again later.', status=429)
+
+    def decorator(function):
+        if asyncio.iscoroutinefunction(function):
+            @wraps(function)
+            async def async_wrap(request, *args, **kwargs):
+                # the backends do blocking cache I/O
+                if await sync_to_async(limited)(request, *args, **kwargs):
+                    return too_many_requests()
+                return await function(request, *args, **kwargs)
+            return async_wrap
+
+        @wraps(function)
+        def wrap(request, *args, **kwargs):
+            if limited(request, *args, **kwargs):
+                return too_many_requests()
+            return function(request, *args, **kwargs)
+        return wrap
+
+    return decorator
+
+
+def posted_identifier(field):
+    """
+    :returns ratelimit identifier callable reading a normalized POST field
+    """
+    def identifier(request, *args, **kwargs):
+        return request.POST.get(field, '').strip().casefold()
+    return identifier
+
+
+def posted_phone(request, *args, **kwargs):
+    phone = request.POST.get('phone', '')
+    return phone_lookup_value(phone) or phone
+
+
 # def records_activity(function):
 #     @wraps(function)
 #     def wrap(request, *args, **kwargs):
@@ -1,6 +1,28 @@
+import ipaddress
+import logging
+import threading
+from collections import namedtuple
+from functools import lru_cache
+
+from django.conf import settings
 from geoip2.errors import AddressNotFoundError
 from user_agents import parse
-from django.contrib.gis.geoip2 import GeoIP2
+from django.contrib.gis.geoip2 import GeoIP2, GeoIP2Exception
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN_LOCATION = 'Unknown-IP-Location'
+# MaxMind city blocks are rarely narrower than these, so one lookup serves the subnet
+GEOIP_SUBNET_PREFIXES = getattr(settings, 'ACCOUNTS_GEOIP_SUBNET_PREFIXES', {4: 24, 6: 48})
+GEOIP_CACHE_SIZE = getattr(settings, 'ACCOUNTS_GEOIP_CACHE_SIZE', 4096)
+USER_AGENT_CACHE_SIZE = getattr(settings, 'ACCOUNTS_USER_AGENT_CACHE_SIZE', 1024)
+# longer strings are truncated before parsing so cache keys stay small
+USER_AGENT_MAX_LENGTH = 512
+
+DeviceSignature = namedtuple('DeviceSignature', ['machine', 'browser', 'operating_system'])
+
+_geoip = None
+_geoip_lock = threading.Lock()
 
 
 def get_ip(request):
@@ -17,21 +39,88 @@ def get_ip(request):
     return ip
 
 
+def _ua_string(request):
+    return request.META.get("HTTP_USER_AGENT", "Unknown-device")[:USER_AGENT_MAX_LENGTH]
+
+
+@lru_cache(maxsize=USER_AGENT_CACHE_SIZE)
+def parse_user_agent(ua_string):
+    return parse(ua_string)
+
+
+@lru_cache(maxsize=USER_AGENT_CACHE_SIZE)
+def parse_device_signature(ua_string):
+    """
+    :returns DeviceSignature tuple of (machine, browser, operating_system)
+    """
+    user_agent = parse_user_agent(ua_string)
+    machine = '{0} {1}, {2}'.format(user_agent.device.brand, user_agent.get_device(), user_agent.device.family)
+    return DeviceSignature(machine, user_agent.get_browser(), user_agent.get_os())
+
+
 def get_user_agent(request):
-    ua_string = request.META.get("HTTP_USER_AGENT", "Unknown-device")
-    user_agent = parse(ua_string)
-    return user_agent
+    return parse_user_agent(_ua_string(request))
 
 
-def get_location(request):
+def get_device_signature(request):
+    return parse_device_signature(_ua_string(request))
+
 
-    g = GeoIP2()
+def user_agent_cache_info():
+    """
+    :returns hits and misses of the parsed signatures cache
+    """
+    return parse_device_signature.cache_info()
+
+
+def get_geoip():
+    """
+    :returns the process wide memory mapped GeoIP2 reader or None when
+        the database under GEOIP_PATH can't be opened
+    """
+    global _geoip
+    if _geoip is None:
+        with _geoip_lock:
+            if _geoip is None:
+                try:
+                    try:
+                        _geoip = GeoIP2(cache=GeoIP2.MODE_MMAP_EXT)
+                    except ValueError:
+                        # maxminddb C extension isn't installed
+                        _geoip = GeoIP2(cache=GeoIP2.MODE_MMAP)
+                except GeoIP2Exception as err:
+                    logger.warning('GeoIP2 database unavailable, locations are unknown: %s', err)
+                    _geoip = False
+    return _geoip or None
+
+
+@lru_cache(maxsize=GEOIP_CACHE_SIZE)
+def _city_location(network_address):
+    geoip = get_geoip()
+    if geoip is None:
+        return UNKNOWN_LOCATION
     try:
-        req_info = g.city(get_ip(request))
-        result = '{}, {}'.format(req_info['city'], req_info['country_name'])
+        req_info = geoip.city(network_address)
+        return '{}, {}'.format(req_info['city'], req_info['country_name'])
     except (AddressNotFoundError, AttributeError):
-        result = 'Unknown-IP-Location'
+        return UNKNOWN_LOCATION
 
-    return result
+
+def lookup_location(ip):
+    """
+    :param ip: IPv4 or IPv6 address string
+    :returns 'city, country' cached per subnet
+    """
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return UNKNOWN_LOCATION
+    network = ipaddress.ip_network('{}/{}'.format(address, GEOIP_SUBNET_PREFIXES[address.version]), strict=False)
+    return _city_location(str(network.network_address))
+
+
+def get_location(request):
+    return lookup_location(get_ip(request))
 
 
+location_cache_info = _city_location.cache_info
@@ -1,13 +1,17 @@
 from django.contrib.auth import authenticate
 from django import forms
 from django.contrib.auth import get_user_model
+from django.contrib.auth.forms import PasswordResetForm
 from django.core.exceptions import ValidationError
+from django.template import loader
 from django.urls import reverse
 from django.utils.safestring import mark_safe
 
 from .models import Profile, Device
 from phonenumber_field.formfields import PhoneNumberField
 
+from .mail import queue_email
+from .utils import phone_lookup_value
 from .verification import Verificator
 
 User = get_user_model()
@@ -51,7 +55,8 @@ class LoginForm(forms.Form):
                                    attrs={'class': ''}))
     password = forms.CharField(widget=forms.PasswordInput(attrs={'class': ''}), required=True)
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, request=None, **kwargs):
+        self.request = request
         self.cached_user = None
         super(LoginForm, self).__init__(*args, **kwargs)
 
@@ -59,7 +64,7 @@ class LoginForm(forms.Form):
         super().clean()
         username = self.cleaned_data.get('username')
         password = self.cleaned_data.get('password')
-        user = authenticate(username=username, password=password)
+        user = self.authenticate(username, password)
         self.cached_user = user
 
         if not user:
@@ -75,11 +80,33 @@ class LoginForm(forms.Form):
 
         return self.cleaned_data
 
+    def authenticate(self, username, password):
+        """Runs the backends chain, called once per form validation"""
+        if username is None or password is None:
+            return None
+        return authenticate(self.request, username=username, password=password)
+
+    def get_user(self):
+        return self.cached_user
+
     def login(self, request):
-        username = self.cleaned_data.get('username')
-        password = self.cleaned_data.get('password')
-        user = authenticate(username=username, password=password)
-        return user
+        """
+        :returns the user verified by clean() without hashing the password again
+        """
+        return self.get_user()
+
+
+class AsyncLoginForm(LoginForm):
+    """
+    LoginForm for the async views, the credentials are checked off
+    the event loop by accounts.async_views.login_view beforehand
+    """
+    def __init__(self, *args, authenticated_user=None, **kwargs):
+        self.authenticated_user = authenticated_user
+        super(AsyncLoginForm, self).__init__(*args, **kwargs)
+
+    def authenticate(self, username, password):
+        return self.authenticated_user
 
 
 class PhoneVerificationForm(forms.ModelForm):
@@ -93,7 +120,7 @@ class PhoneVerificationForm(forms.ModelForm):
         cleaned_data = super().clean()
         phone = cleaned_data.get("phone")
         try:
-            User.objects.get(phone=phone)
+            self.user = User.objects.select_related('profile').get(phone=phone_lookup_value(phone))
         except User.DoesNotExist as err:
             # self.add_error('phone', err)
             raise ValidationError(err)
@@ -112,12 +139,14 @@ class TokenVerificationForm(forms.Form):
     def __init__(self, request, *args, **kwargs):
         super(TokenVerificationForm, self).__init__(*args, **kwargs)
         self.request = request
+        self.verified_user = None
 
     def is_valid(self):
         try:
             verificator = Verificator(self.request)
             if verificator.fetch_user_phone_from_session():
-                if verificator.check_token():
+                self.verified_user = verificator.check_token()
+                if self.verified_user:
                     return True
                 else:
                     self._errors = {'token': ['Invalid token']}
@@ -129,6 +158,12 @@ class TokenVerificationForm(forms.Form):
 
         return super(TokenVerificationForm, self).is_valid()
 
+    def get_user(self):
+        """
+        :returns the user whose code was checked by is_valid
+        """
+        return self.verified_user or None
+
 
 class TrustedDeviceForm(forms.ModelForm):
     class Meta:
@@ -138,3 +173,19 @@ class TrustedDeviceForm(forms.ModelForm):
             'trusted': forms.HiddenInput()
         }
 
+
+class QueuedPasswordResetForm(PasswordResetForm):
+    """
+    Password reset form that hands the email to the outbound queue
+    """
+    def send_mail(self, subject_template_name, email_template_name,
+                  context, from_email, to_email, html_email_template_name=None):
+        subject = loader.render_to_string(subject_template_name, context)
+        # Email subject *must not* contain newlines
+        subject = ''.join(subject.splitlines())
+        body = loader.render_to_string(email_template_name, context)
+        html_body = None
+        if html_email_template_name is not None:
+            html_body = loader.render_to_string(html_email_template_name, context)
+        queue_email(subject, body, [to_email], from_email=from_email, html_message=html_body)
+
@@ -0,0 +1,129 @@
+"""
+Durable outbound email queue.
+
+With ``ACCOUNTS_EMAIL_QUEUE = True`` emails are stored as QueuedEmail rows
+inside the request and delivered by ``python manage.py send_queued_mail``
+over one SMTP connection per batch, failed sends are retried with an
+exponential backoff. Otherwise queue_email sends right away.
+"""
+import datetime
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection, send_mail
+from django.db import transaction
+from django.utils import timezone
+
+from .models import QueuedEmail
+
+BATCH_SIZE = 100
+# seconds a claimed batch stays hidden from other workers
+CLAIM_LEASE = 5 * 60
+MAX_ATTEMPTS = getattr(settings, 'ACCOUNTS_EMAIL_QUEUE_MAX_ATTEMPTS', 5)
+RETRY_BACKOFF = getattr(settings, 'ACCOUNTS_EMAIL_QUEUE_RETRY_BACKOFF', 60)
+
+
+def queue_email(subject, message, recipient_list, from_email=None, html_message=None):
+    """
+    Store the email for the queue worker or send it when the queue is off
+
+    :param recipient_list: list of email addresses
+    :returns QueuedEmail object or None when sent right away
+    """
+    if not getattr(settings, 'ACCOUNTS_EMAIL_QUEUE', False):
+        send_mail(subject, message, from_email, recipient_list, html_message=html_message)
+        return None
+    return QueuedEmail.objects.create(
+        subject=subject,
+        body=message,
+        html_body=html_message or '',
+        from_email=from_email or '',
+        to=','.join(recipient_list),
+    )
+
+
+def retry_delay(attempts):
+    """
+    :returns timedelta before the next attempt, doubling up to an hour
+    """
+    return datetime.timedelta(seconds=min(RETRY_BACKOFF * 2 ** (attempts - 1), 60 * 60))
+
+
+def claim_batch(batch_size=BATCH_SIZE):
+    """
+    Lease due emails to this worker by pushing their next attempt past
+    the claim lease, a crashed worker's batch becomes due again after it
+
+    :returns list of QueuedEmail objects
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            QueuedEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=QueuedEmail.QUEUED, next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        QueuedEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+            next_attempt_at=now + datetime.timedelta(seconds=CLAIM_LEASE))
+    return batch
+
+
+def _build_message(email, connection):
+    message = EmailMultiAlternatives(email.subject, email.body, email.from_email or None,
+                                     email.recipients, connection=connection)
+    if email.html_body:
+        message.attach_alternative(email.html_body, 'text/html')
+    return message
+
+
+def _fail_all(emails, err, failed):
+    for email in emails:
+        email.last_error = repr(err)
+        failed.append(email)
+
+
+def send_queued(batch_size=BATCH_SIZE):
+    """
+    Claim one batch and send it over a single connection
+
+    :returns tuple of (sent, failed) counts
+    """
+    batch = claim_batch(batch_size)
+    if not batch:
+        return 0, 0
+    sent, failed = [], []
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as err:
+        # the server is unreachable, retry the whole batch later
+        _fail_all(batch, err, failed)
+        batch = []
+    try:
+        for index, email in enumerate(batch):
+            try:
+                _build_message(email, connection).send()
+            except Exception as err:
+                email.last_error = repr(err)
+                failed.append(email)
+                # the connection may be dead, start the rest of the batch on a fresh one
+                connection.close()
+                try:
+                    connection.open()
+                except Exception as err:
+                    _fail_all(batch[index + 1:], err, failed)
+                    break
+            else:
+                sent.append(email)
+    finally:
+        connection.close()
+
+    now = timezone.now()
+    QueuedEmail.objects.filter(pk__in=[email.pk for email in sent]).update(
+        status=QueuedEmail.SENT, sent_at=now, last_error='')
+    for email in failed:
+        email.attempts += 1
+        if email.attempts >= MAX_ATTEMPTS:
+            email.status = QueuedEmail.FAILED
+        email.next_attempt_at = now + retry_delay(email.attempts)
+    QueuedEmail.objects.bulk_update(failed, ['attempts', 'status', 'next_attempt_at', 'last_error'])
+    return len(sent), len(failed)
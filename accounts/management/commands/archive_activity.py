@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from accounts.archive import archive_expired, ARCHIVE_PATH, BATCH_SIZE, RETENTION_DAYS
+
+
+class Command(BaseCommand):
+    help = 'Move old activities into a gzipped JSON lines archive and delete them in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=RETENTION_DAYS,
+                            help='Archive activities older than this many days')
+        parser.add_argument('--path', default=ARCHIVE_PATH,
+                            help='Directory the archive file is written to')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Rows read and deleted per query')
+
+    def handle(self, *args, **options):
+        archived, filename = archive_expired(options['days'], path=options['path'],
+                                             batch_size=options['batch_size'])
+        if filename:
+            self.stdout.write('Archived {} activities to {}.'.format(archived, filename))
+        else:
+            self.stdout.write('No activities older than {} days.'.format(options['days']))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from accounts.sessions import prune_sessions, BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Drop session index rows of expired or deleted sessions, run after clearsessions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Index rows checked per query')
+
+    def handle(self, *args, **options):
+        pruned = prune_sessions(options['batch_size'])
+        self.stdout.write('Pruned {} session index rows.'.format(pruned))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from accounts.archive import restore_activities, BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Load activities back from archive_activity files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archives', nargs='+', help='Archive files to restore')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Rows inserted per query')
+
+    def handle(self, *args, **options):
+        total = 0
+        for filename in options['archives']:
+            total += restore_activities(filename, batch_size=options['batch_size'])
+        self.stdout.write('Restored {} activities.'.format(total))
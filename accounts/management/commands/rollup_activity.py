@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from accounts.rollup import rollup_activity, BATCH_SIZE, LAG
+
+
+class Command(BaseCommand):
+    help = 'Add the activities recorded since the last run to the daily rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Activity ids aggregated per query')
+        parser.add_argument('--lag', type=int, default=LAG,
+                            help='Seconds recent activities are left for the next run')
+
+    def handle(self, *args, **options):
+        counted = rollup_activity(options['batch_size'], options['lag'])
+        self.stdout.write('Counted {} activities.'.format(counted))
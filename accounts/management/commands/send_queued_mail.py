@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.mail import send_queued, BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Send queued emails in batches over one SMTP connection per batch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Emails claimed and sent per connection')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep polling the queue instead of exiting once it is drained')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Seconds to sleep between polls of an empty queue')
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = send_queued(options['batch_size'])
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write('Sent {} emails, {} failed.'.format(total_sent, total_failed))
@@ -0,0 +1,53 @@
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from accounts.utils import load_permissions, resolve_permissions, sync_group_permissions
+
+
+class Command(BaseCommand):
+    help = ('Sync group permissions from ACCOUNTS_GROUP_PERMISSIONS or a JSON file mapping group names '
+            'to assign_permissions arguments, only the differences are written')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', help='JSON file used instead of ACCOUNTS_GROUP_PERMISSIONS')
+        parser.add_argument('--dry-run', action='store_true', help='Report the changes without writing them')
+
+    def get_config(self, options):
+        if options['file']:
+            try:
+                with open(options['file']) as stream:
+                    return json.load(stream)
+            except (OSError, ValueError) as err:
+                raise CommandError('Could not read {}: {}'.format(options['file'], err))
+        config = getattr(settings, 'ACCOUNTS_GROUP_PERMISSIONS', None)
+        if not config:
+            raise CommandError('Set ACCOUNTS_GROUP_PERMISSIONS or pass --file.')
+        return config
+
+    def handle(self, *args, **options):
+        config = self.get_config(options)
+        permissions = load_permissions()
+        current = defaultdict(set)
+        for group_id, permission_id in Group.permissions.through.objects.filter(
+                group__name__in=list(config)).values_list('group_id', 'permission_id'):
+            current[group_id].add(permission_id)
+
+        with transaction.atomic():
+            for name, rules in config.items():
+                unknown = set(rules) - {'ltd_access_apps', 'full_access_apps', 'restricted_models'}
+                if unknown:
+                    raise CommandError('Unknown keys for group {}: {}'.format(name, ', '.join(sorted(unknown))))
+                target = resolve_permissions(permissions, **rules)
+                if options['dry_run']:
+                    group = Group.objects.filter(name=name).first()
+                    existing = current[group.pk] if group else set()
+                    added, removed = len(target - existing), len(existing - target)
+                else:
+                    group = Group.objects.get_or_create(name=name)[0]
+                    added, removed = sync_group_permissions(group, target, current[group.pk])
+                self.stdout.write('{}: {} added, {} removed.'.format(name, added, removed))
@@ -0,0 +1,32 @@
+# Generated by Django 3.1.4 on 2026-10-18 03:37
+
+from django.db import migrations, models
+
+
+def populate_email_lookup(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    batch = []
+    for user in User.objects.only('pk', 'email').iterator(chunk_size=2000):
+        user.email_lookup = (user.email or '').strip().casefold()
+        batch.append(user)
+        if len(batch) == 2000:
+            User.objects.bulk_update(batch, ['email_lookup'])
+            batch = []
+    if batch:
+        User.objects.bulk_update(batch, ['email_lookup'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='email_lookup',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=254),
+        ),
+        migrations.RunPython(populate_email_lookup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.1.4 on 2026-10-18 03:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_email_lookup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='device',
+            index=models.Index(fields=['user', 'ip'], name='accounts_device_user_ip'),
+        ),
+    ]
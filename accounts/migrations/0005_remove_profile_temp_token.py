@@ -0,0 +1,17 @@
+# Generated by Django 3.1.4 on 2026-10-18 03:48
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_queuedemail'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='profile',
+            name='temp_token',
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.1.4 on 2026-10-18 03:51
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_remove_profile_temp_token'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='activity',
+            name='created',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.1.4 on 2026-10-18 03:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_activity_created_default'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['user', '-created', '-id'], name='accounts_activity_feed'),
+        ),
+    ]
@@ -7,15 +7,18 @@ from django.db import models
 
 from django.template.loader import render_to_string
 from django.urls import reverse
+from django.utils import timezone
 
-from accounts.utils import CustomImageField
+from accounts.utils import CustomImageField, email_lookup_value
 from phonenumber_field.modelfields import PhoneNumberField
 
-from .device_generator import get_user_agent, get_location, get_ip
+from .device_generator import get_device_signature, get_location, get_ip
 
 
 class User(AbstractUser):
     phone = PhoneNumberField(unique=True, help_text='Mobile number')
+    # case-folded copy of email so lookups hit an index
+    email_lookup = models.CharField(max_length=254, blank=True, db_index=True, editable=False)
 
     def __init__(self, *args, **kwargs):
         super(User, self).__init__(*args, **kwargs)
@@ -30,6 +33,10 @@ class User(AbstractUser):
 
     def save(self, *args, **kwargs):
         self.check_verified_fields()
+        self.email_lookup = email_lookup_value(self.email)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'email' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'email_lookup'}
         super(User, self).save(*args, **kwargs)
 
     def check_verified_fields(self):
@@ -49,7 +56,6 @@ class Profile(models.Model):
     photo = CustomImageField(upload_to='uploads/users/avatar/', blank=True)
     email_verified = models.BooleanField(default=False)
     phone_verified = models.BooleanField(default=False)
-    temp_token = models.CharField(blank=True, default='', max_length=100)
 
     def __str__(self):
         return 'Profile for user {}'.format(self.user.username)
@@ -65,6 +71,11 @@ class Device(models.Model):
     trusted = models.BooleanField(default=False)
     created = models.DateTimeField(auto_now_add=True, db_index=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'ip'], name='accounts_device_user_ip'),
+        ]
+
     def __str__(self):
         return '{} from {} - {}'.format(self.machine, self.ip, self.location)
 
@@ -75,13 +86,12 @@ class Device(models.Model):
     :returns device object
     """
     def generate_new_signature(self, request):
-        user_agent = get_user_agent(request)
-        device = '{0} {1}, {2}'.format(user_agent.device.brand, user_agent.get_device(), user_agent.device.family)
+        signature = get_device_signature(request)
         new_device = Device.objects.create(
             user=request.user,
-            machine=request.META.get('REMOTE_USER', device),
-            browser=user_agent.get_browser(),
-            operating_system=user_agent.get_os(),
+            machine=request.META.get('REMOTE_USER', signature.machine),
+            browser=signature.browser,
+            operating_system=signature.operating_system,
             location=get_location(request),
             ip=get_ip(request),
         )
@@ -90,9 +100,8 @@ class Device(models.Model):
     def check_device_signature(self, request, user):
         """Keep record of user's Host and machine Mac_address
         """
-        list_user_trusted_devices = Device.objects.filter(user=user)
         login_ip = get_ip(request)
-        if login_ip in list_user_trusted_devices.values_list('ip', flat=True):
+        if Device.objects.filter(user=user, ip=login_ip).exists():
             return False
         else:
             # TODO: security steps TFA
@@ -108,7 +117,8 @@ class Device(models.Model):
             'domain': current_site.domain,
             'device': device
         })
-        request.user.email_user(subject, message, html_message=message)
+        from .mail import queue_email
+        queue_email(subject, message, [request.user.email], html_message=message)
 
 
 class Activity(models.Model):
@@ -126,9 +136,104 @@ class Activity(models.Model):
                                             blank=True,
                                             db_index=True)
     target = GenericForeignKey('target_ct', 'target_id')
-    created = models.DateTimeField(auto_now_add=True,
+    # set when recorded, buffered activities are written later
+    created = models.DateTimeField(default=timezone.now,
+                                   editable=False,
                                    db_index=True)
 
     class Meta:
         ordering = ('-created',)
         verbose_name_plural = 'activities'
+        indexes = [
+            # keyset pagination of the user's activity feed
+            models.Index(fields=['user', '-created', '-id'], name='accounts_activity_feed'),
+        ]
+
+
+class ActivityRollup(models.Model):
+    """
+    Activities counted per day, verb and user by the rollup_activity
+    command, totals per verb are summed over users
+    """
+    day = models.DateField()
+    verb = models.CharField(max_length=255)
+    user = models.ForeignKey(User, related_name='activity_rollups', on_delete=models.CASCADE)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ('-day', 'verb')
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'verb', 'user'], name='accounts_activityrollup_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['verb', 'day'], name='accounts_rollup_verb_day'),
+        ]
+
+    def __str__(self):
+        return '{} {} x{} on {}'.format(self.user_id, self.verb, self.count, self.day)
+
+
+class RollupWatermark(models.Model):
+    """
+    Highest activity id already counted by a rollup
+    """
+    name = models.CharField(max_length=100, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return '{} at {}'.format(self.name, self.last_id)
+
+
+class UserSession(models.Model):
+    """
+    Session keys of each user, recorded at login and dropped at logout
+    so a user's sessions can be revoked without decoding the session table
+    """
+    user = models.ForeignKey(User, related_name='session_keys', on_delete=models.CASCADE)
+    session_key = models.CharField(max_length=40, unique=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return '{} session of {}'.format(self.session_key[:8], self.user_id)
+
+
+class QueuedEmail(models.Model):
+    """
+    Outgoing email stored by accounts.mail.queue_email and delivered in
+    batches by the send_queued_mail command
+    """
+    QUEUED = 'queued'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'Queued'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    )
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=254, blank=True)
+    to = models.TextField(help_text='Comma separated recipients')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # doubles as the claim lease while a worker is sending
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ('next_attempt_at',)
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='accounts_queuedemail_due'),
+        ]
+
+    def __str__(self):
+        return '{} to {}'.format(self.subject, self.to)
+
+    @property
+    def recipients(self):
+        return [address for address in self.to.split(',') if address]
+
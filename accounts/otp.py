@@ -0,0 +1,65 @@
+"""
+Phone verification codes kept in the Django cache instead of the profile
+row. A code expires after ``ACCOUNTS_OTP_TIMEOUT`` seconds and is dropped
+once ``ACCOUNTS_OTP_MAX_ATTEMPTS`` wrong guesses were counted against it.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.crypto import constant_time_compare
+
+CACHE_ALIAS = getattr(settings, 'ACCOUNTS_OTP_CACHE_ALIAS', 'default')
+OTP_TIMEOUT = getattr(settings, 'ACCOUNTS_OTP_TIMEOUT', 300)
+MAX_ATTEMPTS = getattr(settings, 'ACCOUNTS_OTP_MAX_ATTEMPTS', 5)
+KEY_PREFIX = 'accounts:otp:'
+
+
+def _keys(phone):
+    return '{}{}:code'.format(KEY_PREFIX, phone), '{}{}:attempts'.format(KEY_PREFIX, phone)
+
+
+def store_code(phone, code):
+    """
+    Replace any pending code of the phone and reset its attempts
+    """
+    code_key, attempts_key = _keys(phone)
+    cache = caches[CACHE_ALIAS]
+    cache.set(code_key, str(code), OTP_TIMEOUT)
+    cache.delete(attempts_key)
+
+
+def check_code(phone, code):
+    """
+    Compare without consuming the code, each guess reserves an attempt
+    atomically before it is compared so concurrent requests can't exceed
+    the attempts, a right guess gives its attempt back
+
+    :returns True if the code matches the pending one
+    """
+    code_key, attempts_key = _keys(phone)
+    cache = caches[CACHE_ALIAS]
+    stored = cache.get(code_key)
+    if stored is None:
+        return False
+    cache.add(attempts_key, 0, OTP_TIMEOUT)
+    try:
+        attempts = cache.incr(attempts_key)
+    except ValueError:
+        # expired between add and incr
+        attempts = 1
+        cache.set(attempts_key, attempts, OTP_TIMEOUT)
+    if attempts > MAX_ATTEMPTS:
+        discard_code(phone)
+        return False
+    if constant_time_compare(stored, str(code)):
+        try:
+            cache.decr(attempts_key)
+        except ValueError:
+            pass
+        return True
+    if attempts >= MAX_ATTEMPTS:
+        discard_code(phone)
+    return False
+
+
+def discard_code(phone):
+    caches[CACHE_ALIAS].delete_many(_keys(phone))
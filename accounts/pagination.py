@@ -0,0 +1,99 @@
+"""
+Keyset pagination over ``(created, id)``, each page is an index range
+read from the last row of the previous one so deep pages cost the same as
+the first.
+
+EstimatedCountPaginator is for admin changelists of large tables, it
+reads the row count of an unfiltered table from the database statistics.
+"""
+import base64
+import binascii
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+ESTIMATE_THRESHOLD = getattr(settings, 'ACCOUNTS_ESTIMATED_COUNT_THRESHOLD', 10000)
+
+
+def encode_cursor(obj):
+    value = '{}|{}'.format(obj.created.isoformat(), obj.pk)
+    return base64.urlsafe_b64encode(value.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """
+    :returns tuple of (created, id)
+    :raises ValueError: on a malformed cursor
+    """
+    try:
+        created, pk = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|')
+        created = parse_datetime(created)
+    except (TypeError, UnicodeError, binascii.Error) as err:
+        raise ValueError('Invalid cursor') from err
+    if created is None:
+        raise ValueError('Invalid cursor')
+    return created, int(pk)
+
+
+def keyset_page(queryset, cursor=None, per_page=20):
+    """
+    Newest first page of the queryset following the cursor
+
+    :param cursor: value returned as next cursor by the previous page
+    :returns tuple of (list of objects, next cursor or None)
+    """
+    queryset = queryset.order_by('-created', '-id')
+    if cursor:
+        created, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(created__lt=created) | Q(created=created, id__lt=pk))
+    # one extra row tells if there is a next page without a count
+    objects = list(queryset[:per_page + 1])
+    if len(objects) > per_page:
+        objects = objects[:per_page]
+        return objects, encode_cursor(objects[-1])
+    return objects, None
+
+
+def estimate_table_rows(model, using='default'):
+    """
+    :returns the planner row estimate of the model table or None when the
+        database keeps no such statistics
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples FROM pg_class WHERE oid = %s::regclass'
+        table = connection.ops.quote_name(table)
+    elif connection.vendor == 'mysql':
+        sql = 'SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s'
+    else:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [table])
+        row = cursor.fetchone()
+    # reltuples is -1 on tables never analyzed
+    return int(row[0]) if row and row[0] is not None and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Counts an unfiltered queryset from the table statistics once they
+    report more than ACCOUNTS_ESTIMATED_COUNT_THRESHOLD rows, smaller and
+    filtered querysets are counted exactly. Use it with
+    ``show_full_result_count = False`` on the model admin.
+    """
+    threshold = ESTIMATE_THRESHOLD
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        query = getattr(queryset, 'query', None)
+        if query is not None and not query.where and not query.distinct and not query.combinator:
+            estimate = estimate_table_rows(queryset.model, queryset.db)
+            if estimate is not None and estimate >= self.threshold:
+                return estimate
+        return super().count
@@ -0,0 +1,165 @@
+"""
+Sliding window rate limiting for the login and verification views.
+
+Limits are grouped per view and counted separately per client IP and per
+identifier (username, phone, user id). Backends:
+
+* ``accounts.ratelimit.LocMemRateLimitBackend`` in-process exact window
+* ``accounts.ratelimit.CacheRateLimitBackend`` shared through Django cache
+
+.. code-block:: python
+
+    ACCOUNTS_RATELIMIT_BACKEND = 'accounts.ratelimit.CacheRateLimitBackend'
+    ACCOUNTS_RATELIMITS = {'login': {'ip': '30/m', 'identifier': '10/m'}}
+"""
+import hashlib
+from abc import ABC, abstractmethod
+import threading
+import time
+from collections import OrderedDict, deque
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+DEFAULT_RATES = {
+    'login': {'ip': '30/m', 'identifier': '10/m'},
+    'verify_phone': {'ip': '10/m', 'identifier': '3/m'},
+    'verification_email': {'ip': '10/m', 'identifier': '3/m'},
+}
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+def parse_rate(rate):
+    """
+    :param rate: string like '10/m' or '100/h'
+    :returns tuple of (limit, period in seconds)
+    """
+    limit, period = rate.split('/')
+    return int(limit), PERIODS[period[-1]] * int(period[:-1] or 1)
+
+
+class BaseRateLimitBackend(ABC):
+    @abstractmethod
+    def hit(self, key, limit, period):
+        """
+        Count a request against the key, subclasses must check and count
+        in one step so concurrent requests cannot all slip under the limit
+
+        :param key: group, scope and hashed value of the client
+        :param limit: allowed requests per period
+        :param period: window length in seconds
+        :returns True if the request is allowed
+        """
+
+    def reset(self):
+        pass
+
+
+class LocMemRateLimitBackend(BaseRateLimitBackend):
+    """
+    Exact sliding window log per process, least recently used keys are
+    dropped past max_keys to keep memory bounded
+    """
+    max_keys = 10000
+
+    def __init__(self):
+        self._hits = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, limit, period):
+        now = time.monotonic()
+        with self._lock:
+            hits = self._hits.pop(key, None) or deque()
+            while hits and hits[0] <= now - period:
+                hits.popleft()
+            allowed = len(hits) < limit
+            if allowed:
+                hits.append(now)
+            self._hits[key] = hits
+            while len(self._hits) > self.max_keys:
+                self._hits.popitem(last=False)
+        return allowed
+
+    def reset(self):
+        with self._lock:
+            self._hits.clear()
+
+
+class CacheRateLimitBackend(BaseRateLimitBackend):
+    """
+    Sliding window counter shared by all processes, the previous fixed
+    window is weighted by how much of it still overlaps the sliding one
+    """
+    key_prefix = 'accounts:rl:'
+
+    def __init__(self):
+        self.cache = caches[getattr(settings, 'ACCOUNTS_RATELIMIT_CACHE_ALIAS', 'default')]
+
+    def hit(self, key, limit, period):
+        now = time.time()
+        window = int(now // period)
+        current = '{}{}:{}'.format(self.key_prefix, key, window)
+        previous = '{}{}:{}'.format(self.key_prefix, key, window - 1)
+        self.cache.add(current, 0, period * 2)
+        try:
+            count = self.cache.incr(current)
+        except ValueError:
+            # evicted between add and incr
+            self.cache.set(current, 1, period * 2)
+            count = 1
+        overlap = 1 - (now % period) / period
+        if self.cache.get(previous, 0) * overlap + count <= limit:
+            return True
+        # only allowed requests weigh in the next window
+        try:
+            self.cache.decr(current)
+        except ValueError:
+            pass
+        return False
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                path = getattr(settings, 'ACCOUNTS_RATELIMIT_BACKEND', 'accounts.ratelimit.LocMemRateLimitBackend')
+                _backend = import_string(path)()
+    return _backend
+
+
+def reset_ratelimits():
+    get_backend().reset()
+
+
+def get_rates(group):
+    rates = dict(DEFAULT_RATES.get(group, {}))
+    rates.update(getattr(settings, 'ACCOUNTS_RATELIMITS', {}).get(group, {}))
+    return rates
+
+
+def is_rate_limited(group, ip, identifier=None):
+    """
+    Count one attempt for the ip and the identifier
+
+    :returns True if any of the group rates is exceeded
+    """
+    if not getattr(settings, 'ACCOUNTS_RATELIMIT_ENABLE', True):
+        return False
+    backend = get_backend()
+    rates = get_rates(group)
+    limited = False
+    for scope, value in (('ip', ip), ('identifier', identifier)):
+        if not value or scope not in rates:
+            continue
+        limit, period = parse_rate(rates[scope])
+        digest = hashlib.sha1(str(value).encode('utf-8')).hexdigest()
+        if not backend.hit('{}:{}:{}'.format(group, scope, digest), limit, period):
+            limited = True
+    return limited
@@ -0,0 +1,91 @@
+"""
+Daily activity counts kept in ActivityRollup.
+
+``python manage.py rollup_activity`` counts the activities added since
+its watermark, grouped by day, verb and user, and adds them to the
+rollup rows. Dashboards read the rollups instead of counting the activity
+table, archived activities stay counted.
+
+The watermark is the highest activity id counted. Rows younger than
+``ACCOUNTS_ACTIVITY_ROLLUP_LAG`` seconds are left for the next run so an
+insert committing out of id order isn't skipped.
+"""
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Activity, ActivityRollup, RollupWatermark
+
+WATERMARK = 'activity_daily'
+BATCH_SIZE = 10000
+LAG = getattr(settings, 'ACCOUNTS_ACTIVITY_ROLLUP_LAG', 60)
+
+
+def _add_counts(counts):
+    """
+    :param counts: dict of (day, verb, user_id) to the number to add
+    """
+    existing = ActivityRollup.objects.filter(
+        day__in={day for day, _, _ in counts},
+        verb__in={verb for _, verb, _ in counts},
+        user_id__in={user_id for _, _, user_id in counts},
+    )
+    existing = {(rollup.day, rollup.verb, rollup.user_id): rollup for rollup in existing}
+    updated, created = [], []
+    for key, count in counts.items():
+        if key in existing:
+            existing[key].count += count
+            updated.append(existing[key])
+        else:
+            day, verb, user_id = key
+            created.append(ActivityRollup(day=day, verb=verb, user_id=user_id, count=count))
+    ActivityRollup.objects.bulk_update(updated, ['count'])
+    ActivityRollup.objects.bulk_create(created)
+
+
+def rollup_activity(batch_size=BATCH_SIZE, lag=LAG):
+    """
+    Count the activities added since the last run, runs on other workers
+    wait on the watermark row lock
+
+    :returns number of activities counted
+    """
+    cutoff = timezone.now() - datetime.timedelta(seconds=lag)
+    with transaction.atomic():
+        watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=WATERMARK)
+        upper = Activity.objects.filter(id__gt=watermark.last_id, created__lt=cutoff) \
+            .aggregate(upper=Max('id'))['upper']
+        if upper is None:
+            return 0
+
+        counted, last_id = 0, watermark.last_id
+        while last_id < upper:
+            chunk_upper = min(last_id + batch_size, upper)
+            rows = Activity.objects.filter(id__gt=last_id, id__lte=chunk_upper) \
+                .annotate(day=TruncDate('created')).order_by() \
+                .values('day', 'verb', 'user_id').annotate(count=Count('id'))
+            counts = {(row['day'], row['verb'], row['user_id']): row['count'] for row in rows}
+            if counts:
+                _add_counts(counts)
+                counted += sum(counts.values())
+            last_id = chunk_upper
+
+        watermark.last_id = upper
+        watermark.save(update_fields=['last_id', 'updated'])
+    return counted
+
+
+def daily_counts(verb=None, since=None):
+    """
+    :returns queryset of dicts with day, verb and total, newest day first
+    """
+    rollups = ActivityRollup.objects.all()
+    if verb is not None:
+        rollups = rollups.filter(verb=verb)
+    if since is not None:
+        rollups = rollups.filter(day__gte=since)
+    return rollups.values('day', 'verb').annotate(total=Sum('count')).order_by('-day', 'verb')
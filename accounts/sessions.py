@@ -0,0 +1,145 @@
+"""
+User to session key index used to end every session of a user.
+
+Keys are recorded on user_logged_in and dropped on user_logged_out,
+revoke_sessions deletes the sessions of many users in batches from the
+configured session engine. Signed cookie sessions live on the client and
+can't be revoked.
+
+Keys also change after the login signal, a password change cycles the key
+and a login over another user's session only gets its key once the session
+is saved. ``SessionIndexMiddleware`` placed above SessionMiddleware indexes
+the key the response was saved with:
+
+.. code-block:: python
+
+    MIDDLEWARE = [
+        'accounts.sessions.SessionIndexMiddleware',
+        'django.contrib.sessions.middleware.SessionMiddleware',
+        ...
+    ]
+
+Rows of expired sessions are dropped by ``manage.py prune_user_sessions``,
+run it after ``clearsessions``.
+"""
+from importlib import import_module
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from .models import UserSession
+
+BATCH_SIZE = 1000
+
+
+def index_session(user, session_key, old_session_key=None):
+    if old_session_key:
+        UserSession.objects.filter(session_key=old_session_key).delete()
+    if session_key and user is not None and user.is_authenticated:
+        UserSession.objects.update_or_create(session_key=session_key, defaults={'user': user})
+
+
+def record_session(sender, request, user, **kwargs):
+    session_key = getattr(request, 'session', None) and request.session.session_key
+    index_session(user, session_key)
+
+
+class SessionIndexMiddleware(object):
+    """
+    Follows session key changes the login signal doesn't see, costs no
+    query while the key stays the same
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        session = getattr(request, 'session', None)
+        if session is None:
+            return response
+        # runs after SessionMiddleware saved the session
+        old_session_key = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        if session.session_key != old_session_key:
+            index_session(getattr(request, 'user', None), session.session_key, old_session_key)
+        return response
+
+
+def forget_session(sender, request, user, **kwargs):
+    session_key = getattr(request, 'session', None) and request.session.session_key
+    if session_key:
+        UserSession.objects.filter(session_key=session_key).delete()
+
+
+def _delete_session_keys(session_keys):
+    store = import_module(settings.SESSION_ENGINE).SessionStore
+    if hasattr(store, 'cache_key_prefix'):
+        caches[settings.SESSION_CACHE_ALIAS].delete_many([store.cache_key_prefix + key for key in session_keys])
+    if hasattr(store, 'get_model_class'):
+        store.get_model_class().objects.filter(session_key__in=session_keys).delete()
+
+
+def _chunks(values, size):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def revoke_sessions(user_ids, batch_size=BATCH_SIZE):
+    """
+    End all recorded sessions of the users, each batch is one read of the
+    index and one delete per store
+
+    :param user_ids: iterable of user primary keys, queried batch_size at a time
+    :returns number of sessions revoked
+    """
+    revoked = 0
+    for chunk in _chunks(list(user_ids), batch_size):
+        last_id = 0
+        while True:
+            batch = list(UserSession.objects.filter(user_id__in=chunk, id__gt=last_id)
+                         .order_by('id').values_list('id', 'session_key')[:batch_size])
+            if not batch:
+                break
+            ids = [pk for pk, _ in batch]
+            _delete_session_keys([session_key for _, session_key in batch])
+            UserSession.objects.filter(id__in=ids).delete()
+            revoked += len(batch)
+            last_id = ids[-1]
+            if len(batch) < batch_size:
+                break
+    return revoked
+
+
+def _live_session_keys(session_keys):
+    store = import_module(settings.SESSION_ENGINE).SessionStore
+    if hasattr(store, 'get_model_class'):
+        return set(store.get_model_class().objects
+                   .filter(session_key__in=session_keys, expire_date__gt=timezone.now())
+                   .values_list('session_key', flat=True))
+    if hasattr(store, 'cache_key_prefix'):
+        found = caches[settings.SESSION_CACHE_ALIAS].get_many([store.cache_key_prefix + key for key in session_keys])
+        return {key[len(store.cache_key_prefix):] for key in found}
+    # no way to tell, keep them
+    return set(session_keys)
+
+
+def prune_sessions(batch_size=BATCH_SIZE):
+    """
+    Drop index rows whose session expired or is gone from the store
+
+    :returns number of rows deleted
+    """
+    pruned, last_id = 0, 0
+    while True:
+        batch = list(UserSession.objects.filter(id__gt=last_id)
+                     .order_by('id').values_list('id', 'session_key')[:batch_size])
+        if not batch:
+            break
+        live = _live_session_keys([session_key for _, session_key in batch])
+        stale = [pk for pk, session_key in batch if session_key not in live]
+        if stale:
+            pruned += UserSession.objects.filter(id__in=stale).delete()[0]
+        last_id = batch[-1][0]
+        if len(batch) < batch_size:
+            break
+    return pruned
@@ -1,7 +1,12 @@
 import uuid
-from django.db.models.signals import post_save
-from django.contrib.auth import get_user_model
+from django.core.signals import request_finished
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.contrib.auth import get_user_model, user_logged_in, user_logged_out
+from django.contrib.auth.models import Group
+from .activity import flush_due_activities
 from .models import Profile
+from .sessions import forget_session, record_session
+from .user_cache import invalidate_user, invalidate_users
 User = get_user_model()
 
 
@@ -10,4 +15,46 @@ def create_user_profile(sender, instance, created, **kwargs):
         Profile.objects.create(user=instance)
 
 
-post_save.connect(create_user_profile, sender=User,  weak=False, dispatch_uid=str(uuid.uuid4().hex))
\ No newline at end of file
+def invalidate_cached_user(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+def invalidate_cached_profile_user(sender, instance, **kwargs):
+    invalidate_user(instance.user_id)
+
+
+def invalidate_cached_user_access(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            invalidate_user(instance.pk)
+    elif action == 'pre_clear':
+        invalidate_users(instance.user_set.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        invalidate_users(pk_set)
+
+
+def invalidate_cached_group_access(sender, instance, action, reverse, pk_set, **kwargs):
+    # cached users carry the permission cache of their groups
+    if not reverse:
+        if action.startswith('post_'):
+            invalidate_users(instance.user_set.values_list('pk', flat=True))
+    elif action == 'pre_clear':
+        invalidate_users(User.objects.filter(groups__permissions=instance).values_list('pk', flat=True).distinct())
+    elif action in ('post_add', 'post_remove') and pk_set:
+        invalidate_users(User.objects.filter(groups__in=pk_set).values_list('pk', flat=True).distinct())
+
+
+post_save.connect(create_user_profile, sender=User,  weak=False, dispatch_uid=str(uuid.uuid4().hex))
+post_save.connect(invalidate_cached_user, sender=User, dispatch_uid='accounts_invalidate_user_save')
+post_delete.connect(invalidate_cached_user, sender=User, dispatch_uid='accounts_invalidate_user_delete')
+post_save.connect(invalidate_cached_profile_user, sender=Profile, dispatch_uid='accounts_invalidate_profile_save')
+post_delete.connect(invalidate_cached_profile_user, sender=Profile, dispatch_uid='accounts_invalidate_profile_delete')
+m2m_changed.connect(invalidate_cached_user_access, sender=User.groups.through,
+                    dispatch_uid='accounts_invalidate_user_groups')
+m2m_changed.connect(invalidate_cached_user_access, sender=User.user_permissions.through,
+                    dispatch_uid='accounts_invalidate_user_permissions')
+m2m_changed.connect(invalidate_cached_group_access, sender=Group.permissions.through,
+                    dispatch_uid='accounts_invalidate_group_permissions')
+request_finished.connect(flush_due_activities, dispatch_uid='accounts_flush_due_activities')
+user_logged_in.connect(record_session, dispatch_uid='accounts_record_session')
+user_logged_out.connect(forget_session, dispatch_uid='accounts_forget_session')
@@ -0,0 +1,64 @@
+"""
+Tools for sending sms, modeled on django.core.mail.
+
+The backend is picked by ``ACCOUNTS_SMS_BACKEND``:
+
+* ``accounts.sms.backends.twilio.SmsBackend`` default, sends through Twilio
+* ``accounts.sms.backends.console.SmsBackend`` writes messages to stdout
+* ``accounts.sms.backends.filebased.SmsBackend`` appends JSON lines under
+  ``ACCOUNTS_SMS_FILE_PATH``
+* ``accounts.sms.backends.locmem.SmsBackend`` keeps messages in
+  ``accounts.sms.outbox``
+* ``accounts.sms.backends.batching.SmsBackend`` coalesces messages and hands
+  them to ``ACCOUNTS_SMS_BATCH_BACKEND`` in batches
+"""
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+DEFAULT_BACKEND = 'accounts.sms.backends.twilio.SmsBackend'
+
+
+class SmsMessage(object):
+    def __init__(self, body, to, from_=None, connection=None):
+        self.body = body
+        self.to = str(to)
+        self.from_ = from_ or getattr(settings, 'ACCOUNTS_SMS_FROM', None) or getattr(settings, 'TWILIO_PHONE_NUMBER', '')
+        self.connection = connection
+
+    def __repr__(self):
+        return '<SmsMessage to {}>'.format(self.to)
+
+    def get_connection(self, fail_silently=False):
+        if not self.connection:
+            self.connection = get_connection(fail_silently=fail_silently)
+        return self.connection
+
+    def send(self, fail_silently=False):
+        return self.get_connection(fail_silently).send_messages([self])
+
+
+def get_connection(backend=None, fail_silently=False, **kwargs):
+    """
+    Load an sms backend and return an instance of it,
+    if backend is None use ACCOUNTS_SMS_BACKEND
+    """
+    klass = import_string(backend or getattr(settings, 'ACCOUNTS_SMS_BACKEND', DEFAULT_BACKEND))
+    return klass(fail_silently=fail_silently, **kwargs)
+
+
+def send_sms(body, to, from_=None, fail_silently=False, connection=None):
+    """
+    :returns number of messages sent
+    """
+    connection = connection or get_connection(fail_silently=fail_silently)
+    return SmsMessage(body, to, from_, connection=connection).send()
+
+
+def send_mass_sms(datatuple, fail_silently=False, connection=None):
+    """
+    :param datatuple: iterable of (body, to, from_) tuples
+    :returns number of messages sent
+    """
+    connection = connection or get_connection(fail_silently=fail_silently)
+    messages = [SmsMessage(body, to, from_, connection=connection) for body, to, from_ in datatuple]
+    return connection.send_messages(messages)
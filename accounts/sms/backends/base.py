@@ -0,0 +1,32 @@
+class BaseSmsBackend(object):
+    """
+    Base class for sms backend implementations,
+    subclasses must at least overwrite send_messages()
+    """
+    def __init__(self, fail_silently=False, **kwargs):
+        self.fail_silently = fail_silently
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        try:
+            self.open()
+        except Exception:
+            self.close()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def send_messages(self, messages):
+        """
+        Send one or more SmsMessage objects
+
+        :returns number of messages sent
+        """
+        raise NotImplementedError('subclasses of BaseSmsBackend must override send_messages() method')
@@ -0,0 +1,88 @@
+"""
+Coalesces messages from all requests of a process and hands them to
+``ACCOUNTS_SMS_BATCH_BACKEND`` in one send_messages call, once
+``ACCOUNTS_SMS_BATCH_SIZE`` messages are waiting or
+``ACCOUNTS_SMS_BATCH_INTERVAL`` seconds after the first one, whichever
+comes first. The buffer is flushed at interpreter exit.
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+
+from .base import BaseSmsBackend
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_BACKEND = 'accounts.sms.backends.twilio.SmsBackend'
+
+
+class SmsBatcher(object):
+    def __init__(self, backend, batch_size, interval):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.interval = interval
+        self.buffer = []
+        self.timer = None
+        self._lock = threading.Lock()
+
+    def add(self, messages):
+        with self._lock:
+            self.buffer.extend(messages)
+            full = len(self.buffer) >= self.batch_size
+            if not full and self.timer is None:
+                self.timer = threading.Timer(self.interval, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+        if full:
+            self.flush()
+
+    def flush(self):
+        """
+        :returns number of messages sent
+        """
+        with self._lock:
+            batch, self.buffer = self.buffer, []
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        if not batch:
+            return 0
+        from accounts.sms import get_connection
+        try:
+            with get_connection(self.backend) as connection:
+                return connection.send_messages(batch)
+        except Exception:
+            # the requests that queued the batch have already answered
+            logger.exception('SMS batch of %d messages failed', len(batch))
+            return 0
+
+
+_batcher = None
+_lock = threading.Lock()
+
+
+def get_sms_batcher():
+    global _batcher
+    if _batcher is None:
+        with _lock:
+            if _batcher is None:
+                _batcher = SmsBatcher(
+                    getattr(settings, 'ACCOUNTS_SMS_BATCH_BACKEND', DEFAULT_BATCH_BACKEND),
+                    getattr(settings, 'ACCOUNTS_SMS_BATCH_SIZE', 50),
+                    getattr(settings, 'ACCOUNTS_SMS_BATCH_INTERVAL', 1),
+                )
+                atexit.register(_batcher.flush)
+    return _batcher
+
+
+class SmsBackend(BaseSmsBackend):
+    def send_messages(self, messages):
+        """
+        :returns number of messages accepted into the batch
+        """
+        if not messages:
+            return 0
+        get_sms_batcher().add(list(messages))
+        return len(messages)
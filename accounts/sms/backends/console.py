@@ -0,0 +1,25 @@
+import sys
+import threading
+
+from .base import BaseSmsBackend
+
+
+class SmsBackend(BaseSmsBackend):
+    def __init__(self, *args, stream=None, **kwargs):
+        self.stream = stream or sys.stdout
+        self._lock = threading.RLock()
+        super().__init__(*args, **kwargs)
+
+    def write_message(self, message):
+        self.stream.write('From: {}\nTo: {}\n\n{}\n'.format(message.from_, message.to, message.body))
+        self.stream.write('-' * 79)
+        self.stream.write('\n')
+
+    def send_messages(self, messages):
+        if not messages:
+            return 0
+        with self._lock:
+            for message in messages:
+                self.write_message(message)
+            self.stream.flush()
+        return len(messages)
@@ -0,0 +1,37 @@
+import json
+import os
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+
+from .base import BaseSmsBackend
+
+_lock = threading.Lock()
+
+
+class SmsBackend(BaseSmsBackend):
+    """
+    Appends messages as JSON lines to one file per process under
+    ACCOUNTS_SMS_FILE_PATH so codes can be read back without network
+    """
+    def __init__(self, *args, file_path=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.file_path = file_path or getattr(settings, 'ACCOUNTS_SMS_FILE_PATH', None)
+        if not self.file_path:
+            raise ImproperlyConfigured('ACCOUNTS_SMS_FILE_PATH must be set for the file based sms backend.')
+        os.makedirs(self.file_path, exist_ok=True)
+
+    def _get_filename(self):
+        return os.path.join(self.file_path, 'sms-{}.jsonl'.format(os.getpid()))
+
+    def send_messages(self, messages):
+        if not messages:
+            return 0
+        sent_at = timezone.now().isoformat()
+        lines = ''.join(json.dumps({'to': message.to, 'from': message.from_, 'body': message.body,
+                                    'sent_at': sent_at}) + '\n' for message in messages)
+        with _lock, open(self._get_filename(), 'a') as stream:
+            stream.write(lines)
+        return len(messages)
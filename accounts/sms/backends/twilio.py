@@ -0,0 +1,142 @@
+"""
+Twilio sms backend.
+
+Messages are sent through a process wide Client whose pooled session keeps
+the TLS connection to the API open. With ``ACCOUNTS_SMS_ASYNC = True`` they
+are handed to SmsDispatcher instead and send_messages returns once they are
+scheduled, delivery errors are only logged.
+"""
+import asyncio
+import logging
+import threading
+
+from django.conf import settings
+from twilio.base.exceptions import TwilioRestException
+from twilio.http.http_client import TwilioHttpClient
+from twilio.rest import Client
+
+from .base import BaseSmsBackend
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_dispatcher = None
+_lock = threading.Lock()
+
+
+def get_sms_client():
+    """
+    :returns the process wide Twilio client, its pooled session keeps the
+        TLS connection to the API open between messages
+    """
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = Client(settings.TWILIO_API_KEY, settings.TWILIO_AUTH_TOKEN,
+                                 http_client=TwilioHttpClient(pool_connections=True))
+    return _client
+
+
+class SmsDispatcher(object):
+    """
+    Sends messages from a background event loop thread through one shared
+    aiohttp session, dispatch() returns as soon as the send is scheduled
+    """
+    api_url = 'https://api.twilio.com/2010-04-01/Accounts/{}/Messages.json'
+    timeout = 10
+
+    def __init__(self, account_sid, auth_token):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.loop = None
+        self.session = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self.loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='accounts-sms', daemon=True).start()
+                self.loop = loop
+
+    async def _get_session(self):
+        if self.session is None:
+            import aiohttp
+            self.session = aiohttp.ClientSession(auth=aiohttp.BasicAuth(self.account_sid, self.auth_token),
+                                                 timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self.session
+
+    async def send(self, to, from_, body):
+        session = await self._get_session()
+        url = self.api_url.format(self.account_sid)
+        async with session.post(url, data={'To': to, 'From': from_, 'Body': body}) as response:
+            payload = await response.json(content_type=None)
+            if response.status >= 400:
+                raise TwilioRestException(response.status, url, payload.get('message', ''),
+                                          payload.get('code'), method='POST')
+            return payload
+
+    def dispatch(self, to, from_, body):
+        """
+        :returns concurrent.futures.Future of the API response
+        """
+        self.start()
+        future = asyncio.run_coroutine_threadsafe(self.send(to, from_, body), self.loop)
+        future.add_done_callback(self._log_failure)
+        return future
+
+    def close(self):
+        """
+        Close the session and stop the loop thread
+        """
+        with self._lock:
+            loop, self.loop = self.loop, None
+        if loop is None:
+            return
+        if self.session is not None:
+            asyncio.run_coroutine_threadsafe(self.session.close(), loop).result(timeout=self.timeout)
+            self.session = None
+        loop.call_soon_threadsafe(loop.stop)
+
+    @staticmethod
+    def _log_failure(future):
+        if future.exception() is not None:
+            logger.error('SMS dispatch failed: %r', future.exception())
+
+
+def get_sms_dispatcher():
+    global _dispatcher
+    if _dispatcher is None:
+        with _lock:
+            if _dispatcher is None:
+                _dispatcher = SmsDispatcher(settings.TWILIO_API_KEY, settings.TWILIO_AUTH_TOKEN)
+    return _dispatcher
+
+
+class SmsBackend(BaseSmsBackend):
+    def __init__(self, *args, use_async=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.use_async = getattr(settings, 'ACCOUNTS_SMS_ASYNC', False) if use_async is None else use_async
+
+    def send_messages(self, messages):
+        if not messages:
+            return 0
+        if self.use_async:
+            dispatcher = get_sms_dispatcher()
+            for message in messages:
+                dispatcher.dispatch(to=message.to, from_=message.from_, body=message.body)
+            return len(messages)
+
+        client = get_sms_client()
+        sent = 0
+        for message in messages:
+            try:
+                client.messages.create(body=message.body, from_=message.from_, to=message.to)
+            except TwilioRestException:
+                if not self.fail_silently:
+                    raise
+                logger.exception('SMS to %s failed', message.to)
+            else:
+                sent += 1
+        return sent
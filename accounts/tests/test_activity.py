@@ -0,0 +1,115 @@
+from unittest import mock
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import caches
+from django.db import DatabaseError, connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from accounts import activity
+from accounts.activity import ActivityBuffer, flush_activity_buffer, flush_due_activities, record_activity
+from accounts.models import Activity
+from accounts.utils import create_action
+from .utils import AccountsTestCase
+
+
+class RecordActivityTest(AccountsTestCase):
+    def setUp(self):
+        caches[activity.CACHE_ALIAS].clear()
+        self.user = self.initialize_user()
+        ContentType.objects.get_for_model(self.user)
+
+    def test_dedupes_without_read_query(self):
+        with self.assertNumQueries(1), self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(create_action(self.user, 'logged in', self.user))
+        with self.assertNumQueries(0):
+            self.assertFalse(create_action(self.user, 'logged in', self.user))
+        self.assertEqual(Activity.objects.filter(verb='logged in').count(), 1)
+
+    def test_rolled_back_activity_keeps_window_open(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertRaises(DatabaseError), transaction.atomic():
+                self.assertTrue(record_activity(self.user, 'logged in'))
+                raise DatabaseError
+        self.assertEqual(callbacks, [])
+        self.assertFalse(Activity.objects.exists())
+        self.assertTrue(record_activity(self.user, 'logged in'))
+
+    def test_target_and_verb_are_part_of_the_key(self):
+        other = self.initialize_user(username='other', email='other@test.com', phone='+16469061834')
+        self.assertTrue(record_activity(self.user, 'logged in', self.user))
+        self.assertTrue(record_activity(self.user, 'logged in', other))
+        self.assertTrue(record_activity(self.user, 'logged in'))
+        self.assertTrue(record_activity(self.user, 'logged out'))
+        self.assertEqual(Activity.objects.count(), 4)
+
+    @override_settings(ACCOUNTS_ACTIVITY_DEDUPE='db')
+    def test_db_fallback(self):
+        self.assertTrue(record_activity(self.user, 'logged in', self.user))
+        with self.assertNumQueries(1):
+            self.assertFalse(record_activity(self.user, 'logged in', self.user))
+        self.assertTrue(record_activity(self.user, 'logged in'))
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+    def test_dummy_cache_uses_db(self):
+        self.assertFalse(activity.use_cache())
+
+
+@override_settings(ACCOUNTS_ACTIVITY_BUFFER=True)
+class ActivityBufferTest(AccountsTestCase):
+    def setUp(self):
+        caches[activity.CACHE_ALIAS].clear()
+        self.user = self.initialize_user()
+        self.buffer = ActivityBuffer(size=3, interval=60)
+        original = activity._buffer
+        activity._buffer = self.buffer
+        self.addCleanup(setattr, activity, '_buffer', original)
+        self.addCleanup(self.buffer.flush)
+
+    def test_flushes_on_size(self):
+        record_activity(self.user, 'verb 1')
+        record_activity(self.user, 'verb 2')
+        self.assertEqual(Activity.objects.count(), 0)
+        with self.captureOnCommitCallbacks() as callbacks:
+            record_activity(self.user, 'verb 3')
+        # written once the filling request commits
+        self.assertEqual(Activity.objects.count(), 0)
+        with CaptureQueriesContext(connection) as queries:
+            for callback in callbacks:
+                callback()
+        self.assertEqual(len([q for q in queries if q['sql'].startswith('INSERT')]), 1)
+        self.assertEqual(Activity.objects.count(), 3)
+        self.assertIsNone(self.buffer.timer)
+
+    def test_rollback_keeps_buffered_activities(self):
+        record_activity(self.user, 'verb 1')
+        record_activity(self.user, 'verb 2')
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertRaises(DatabaseError), transaction.atomic():
+                record_activity(self.user, 'verb 3')
+                raise DatabaseError
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.buffer.flush(), 3)
+
+    def test_flush_keeps_recording_time(self):
+        before = timezone.now()
+        record_activity(self.user, 'logged in')
+        self.assertEqual(flush_activity_buffer(), 1)
+        self.assertGreaterEqual(Activity.objects.get().created, before)
+        self.assertLess(Activity.objects.get().created, timezone.now())
+
+    def test_request_finished_flushes_when_due(self):
+        record_activity(self.user, 'logged in')
+        flush_due_activities()
+        self.assertEqual(Activity.objects.count(), 0)
+        self.buffer.interval = 0
+        flush_due_activities()
+        self.assertEqual(Activity.objects.count(), 1)
+
+    def test_failed_bulk_insert_saves_one_by_one(self):
+        record_activity(self.user, 'logged in')
+        record_activity(self.user, 'logged out')
+        with mock.patch.object(Activity.objects, 'bulk_create', side_effect=DatabaseError):
+            self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(Activity.objects.count(), 2)
@@ -0,0 +1,207 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.sessions.models import Session
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.admin import CustomUserAdmin
+from accounts.admin_filters import AutocompleteFilter
+from accounts.pagination import EstimatedCountPaginator, estimate_table_rows
+from accounts.models import Activity, Device, UserSession
+from .utils import AccountsTestCase
+
+
+class AdminTestCase(AccountsTestCase):
+    def setUp(self):
+        self.admin = self.initialize_user(username='admin', email='admin@test.com', phone='+16469061899',
+                                          is_staff=True, is_superuser=True)
+        self.admin.is_staff = self.admin.is_superuser = True
+        self.admin.save()
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def count_queries(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+
+class ActivityAdminTest(AdminTestCase):
+    def add_activities(self, start, stop):
+        for i in range(start, stop):
+            user = self.initialize_user(username='user{}'.format(i), email='user{}@test.com'.format(i),
+                                        phone='+1646906{:04d}'.format(i))
+            device = Device.objects.create(user=user, machine='pc', browser='firefox', operating_system='linux',
+                                           ip='10.0.0.{}'.format(i), location='Unknown-IP-Location')
+            Activity.objects.create(user=user, verb='logged in', target=user)
+            Activity.objects.create(user=user, verb='trusted device', target=device)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        url = reverse('admin:accounts_activity_changelist')
+        # warm the session user cache
+        self.client.get(url)
+        self.add_activities(0, 2)
+        few = self.count_queries(url)
+        self.add_activities(2, 20)
+        self.assertEqual(self.count_queries(url), few)
+
+
+class UserAdminTest(AdminTestCase):
+    def add_users(self, start, stop):
+        users = []
+        for i in range(start, stop):
+            user = self.initialize_user(username='user{}'.format(i), email='user{}@test.com'.format(i),
+                                        phone='+1646906{:04d}'.format(i))
+            for j in range(2):
+                Device.objects.create(user=user, machine='pc', browser='firefox', operating_system='linux',
+                                      ip='10.0.{}.{}'.format(i, j), location='City {}-{}'.format(i, j))
+            Activity.objects.create(user=user, verb='logged in')
+            users.append(user)
+        return users
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        url = reverse('admin:accounts_user_changelist')
+        self.client.get(url)
+        self.add_users(0, 2)
+        few = self.count_queries(url)
+        self.add_users(2, 20)
+        self.assertEqual(self.count_queries(url), few)
+
+    def test_columns(self):
+        user, = self.add_users(0, 1)
+        Device.objects.filter(user=user, location='City 0-1').update(created=timezone.now() + timedelta(days=1))
+        response = self.client.get(reverse('admin:accounts_user_changelist'))
+        row = next(obj for obj in response.context['cl'].result_list if obj.pk == user.pk)
+        self.assertEqual((row.last_device_location, row.device_total, row.activity_total), ('City 0-1', 2, 1))
+        # the admin has no devices
+        admin_row = next(obj for obj in response.context['cl'].result_list if obj.pk == self.admin.pk)
+        self.assertEqual((admin_row.last_device_location, admin_row.device_total), (None, 0))
+
+    def test_count_and_change_view_skip_columns(self):
+        user, = self.add_users(0, 1)
+        url = reverse('admin:accounts_user_changelist')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        counts = [query['sql'] for query in queries if 'COUNT(*)' in query['sql']]
+        self.assertTrue(counts)
+        for sql in counts:
+            self.assertNotIn('accounts_device', sql)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('admin:accounts_user_change', args=(user.pk,)))
+        self.assertFalse([query for query in queries if 'accounts_activity' in query['sql']])
+
+    def test_order_by_column(self):
+        first, second = self.add_users(0, 2)
+        Device.objects.filter(user=first).delete()
+        index = CustomUserAdmin.list_display.index('device_count') + 1
+        response = self.client.get(reverse('admin:accounts_user_changelist'), {'o': '-{}'.format(index)})
+        self.assertEqual([user.device_total for user in response.context['cl'].result_list], [2, 0, 0])
+        self.assertEqual(response.context['cl'].result_list[0].pk, second.pk)
+
+    def test_suspend_action(self):
+        user, = self.add_users(0, 1)
+        session = Client()
+        session.force_login(user)
+        response = self.client.post(reverse('admin:accounts_user_changelist'),
+                                    {'action': 'suspend_account', '_selected_action': [user.pk]})
+        self.assertEqual(response.status_code, 302)
+        user.refresh_from_db()
+        self.assertFalse(user.is_active)
+        self.assertFalse(Session.objects.filter(session_key=session.session.session_key).exists())
+
+    def test_logout_everywhere_action(self):
+        user, = self.add_users(0, 1)
+        sessions = [Client(), Client()]
+        for session in sessions:
+            session.force_login(user)
+        response = self.client.post(reverse('admin:accounts_user_changelist'),
+                                    {'action': 'logout_everywhere', '_selected_action': [user.pk]}, follow=True)
+        self.assertContains(response, 'Ended 2 sessions.')
+        user.refresh_from_db()
+        self.assertTrue(user.is_active)
+        self.assertFalse(UserSession.objects.filter(user=user).exists())
+
+
+class AutocompleteFilterTest(AdminTestCase):
+    def setUp(self):
+        super().setUp()
+        for i, location in enumerate(['Berlin', 'Bern', 'Boston', 'Cairo']):
+            Device.objects.create(user=self.admin, machine='pc', browser='firefox', operating_system='linux',
+                                  ip='10.0.0.{}'.format(i), location=location)
+        Device.objects.create(user=self.admin, machine='pc', browser='firefox', operating_system='linux',
+                              ip='10.0.0.9', location='Berlin')
+
+    def suggestions(self, field, term=''):
+        response = self.client.get(reverse('admin:accounts_device_filter_autocomplete'),
+                                   {'field': field, 'term': term})
+        return response.json()['results']
+
+    def test_suggestions(self):
+        self.assertEqual(self.suggestions('location', 'ber'), ['Berlin', 'Bern'])
+        self.assertEqual(self.suggestions('user', 'ad'), ['admin'])
+        # relations read the user table, not the devices
+        with CaptureQueriesContext(connection) as queries:
+            self.suggestions('user', 'ad')
+        sql, = [query['sql'] for query in queries if 'username' in query['sql'] and 'LIKE' in query['sql']]
+        self.assertNotIn('accounts_device', sql)
+        self.assertNotIn('DISTINCT', sql)
+        with mock.patch.object(AutocompleteFilter, 'limit', 2):
+            self.assertEqual(self.suggestions('location'), ['Berlin', 'Bern'])
+
+    def test_unknown_field(self):
+        response = self.client.get(reverse('admin:accounts_device_filter_autocomplete'), {'field': 'ip'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_changelist_filters_by_value(self):
+        url = reverse('admin:accounts_device_changelist')
+        response = self.client.get(url, {'location__exact': 'Berlin', 'user__username__exact': 'admin'})
+        self.assertEqual(response.context['cl'].result_count, 2)
+        # the sidebar no longer lists every location
+        self.assertNotContains(response, 'Cairo')
+        self.assertContains(response, 'filter-autocomplete/?field=location')
+
+    def test_log_entry_user_filter(self):
+        response = self.client.get(reverse('admin:admin_logentry_changelist'), {'user__username__exact': 'admin'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'filter-autocomplete/?field=user')
+
+
+class EstimatedCountPaginatorTest(AdminTestCase):
+    def setUp(self):
+        super().setUp()
+        for verb in ('logged in', 'logged in', 'created account'):
+            Activity.objects.create(user=self.admin, verb=verb)
+
+    def test_unsupported_database_counts_exactly(self):
+        self.assertIsNone(estimate_table_rows(Activity))
+        self.assertEqual(EstimatedCountPaginator(Activity.objects.all(), 10).count, 3)
+
+    @mock.patch('accounts.pagination.estimate_table_rows', return_value=2000000)
+    def test_large_table_uses_estimate(self, estimate):
+        with self.assertNumQueries(0):
+            self.assertEqual(EstimatedCountPaginator(Activity.objects.order_by('-created'), 10).count, 2000000)
+        # filtered sets are counted
+        self.assertEqual(EstimatedCountPaginator(Activity.objects.filter(verb='logged in'), 10).count, 2)
+
+    @mock.patch('accounts.pagination.estimate_table_rows', return_value=100)
+    def test_small_table_counts_exactly(self, estimate):
+        self.assertEqual(EstimatedCountPaginator(Activity.objects.all(), 10).count, 3)
+
+    @mock.patch('accounts.pagination.estimate_table_rows', return_value=2000000)
+    def test_changelist_counts_once(self, estimate):
+        url = reverse('admin:accounts_activity_changelist')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertFalse([q for q in queries if 'COUNT(' in q['sql']])
+        self.assertEqual(response.context['cl'].result_count, 2000000)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'created__gte': '2000-01-01 00:00:00+00:00'})
+        self.assertEqual(len([q for q in queries if 'COUNT(' in q['sql']]), 1)
+        self.assertEqual(response.context['cl'].result_count, 3)
@@ -0,0 +1,68 @@
+import datetime
+import gzip
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from accounts.archive import archive_activities, restore_activities
+from accounts.models import Activity
+from .utils import AccountsTestCase
+
+
+class ActivityArchiveTest(AccountsTestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        self.user = self.initialize_user()
+        now = timezone.now()
+        self.old = [Activity.objects.create(user=self.user, verb='old {}'.format(i), target=self.user,
+                                            created=now - datetime.timedelta(days=100 + i)) for i in range(5)]
+        self.recent = Activity.objects.create(user=self.user, verb='recent', created=now)
+
+    def test_archive_and_restore(self):
+        cutoff = timezone.now() - datetime.timedelta(days=90)
+        with self.assertNumQueries(8):
+            # exists, content types, then a read and a delete per chunk of 2
+            archived, filename = archive_activities(cutoff, path=self.path, batch_size=2)
+        self.assertEqual(archived, 5)
+        self.assertEqual(list(Activity.objects.all()), [self.recent])
+
+        self.assertEqual(restore_activities(filename, batch_size=2), 5)
+        restored = Activity.objects.get(pk=self.old[0].pk)
+        self.assertEqual((restored.verb, restored.created, restored.target),
+                         (self.old[0].verb, self.old[0].created, self.user))
+        # restoring twice skips existing rows
+        restore_activities(filename)
+        self.assertEqual(Activity.objects.count(), 6)
+
+    def test_truncated_archive(self):
+        cutoff = timezone.now() - datetime.timedelta(days=90)
+        _, filename = archive_activities(cutoff, path=self.path, batch_size=2)
+        with open(filename, 'rb') as stream:
+            data = stream.read()
+        with open(filename, 'wb') as stream:
+            # drop the gzip trailer as if the process died before closing the file
+            stream.write(data[:-8])
+        self.assertEqual(restore_activities(filename), 5)
+
+    def test_commands(self):
+        stdout = StringIO()
+        call_command('archive_activity', days=90, path=self.path, stdout=stdout)
+        filename, = os.listdir(self.path)
+        self.assertIn('Archived 5 activities', stdout.getvalue())
+        with gzip.open(os.path.join(self.path, filename), 'rt') as stream:
+            self.assertEqual(len(stream.readlines()), 5)
+
+        call_command('restore_activity', os.path.join(self.path, filename), stdout=stdout)
+        self.assertIn('Restored 5 activities', stdout.getvalue())
+        self.assertEqual(Activity.objects.count(), 6)
+
+    def test_nothing_to_archive(self):
+        stdout = StringIO()
+        call_command('archive_activity', days=365, path=self.path, stdout=stdout)
+        self.assertEqual(os.listdir(self.path), [])
+        self.assertIn('No activities older than 365 days', stdout.getvalue())
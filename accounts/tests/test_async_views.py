@@ -0,0 +1,98 @@
+import threading
+from unittest import mock
+from urllib.parse import urlencode
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model, user_login_failed, BACKEND_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.test import AsyncRequestFactory
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from accounts import async_views
+from accounts.tokens import account_activation_token
+from .utils import AccountsTransactionTestCase
+
+User = get_user_model()
+
+
+class AsyncViewsTest(AccountsTransactionTestCase):
+    def setUp(self):
+        self.rf = AsyncRequestFactory()
+
+    def post(self, view, path, data, *args):
+        request = self.rf.post(path, data=urlencode(data), content_type='application/x-www-form-urlencoded')
+        self.process_requests(request)
+        request.user = AnonymousUser()
+        return request, async_to_sync(view)(request, *args)
+
+    @mock.patch('accounts.models.get_location', return_value='Unknown-IP-Location')
+    def test_login_hashes_in_executor(self, get_location):
+        user = self.initialize_user()
+        threads = []
+        original_verify = PBKDF2PasswordHasher.verify
+
+        def verify(hasher, password, encoded):
+            threads.append(threading.current_thread().name)
+            return original_verify(hasher, password, encoded)
+
+        with mock.patch.object(PBKDF2PasswordHasher, 'verify', autospec=True, side_effect=verify):
+            request, response = self.post(async_views.login_view, reverse('auth:login'),
+                                          {'username': 'test_user', 'password': 'rrrr'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.url, reverse('auth:new_device'))
+        self.assertEqual(request.session[SESSION_KEY], str(user.pk))
+        self.assertEqual(request.session[BACKEND_SESSION_KEY], 'accounts.authentication.IdentifierAuthBackend')
+        self.assertEqual(len(threads), 1)
+        self.assertTrue(threads[0].startswith('accounts'))
+
+    def test_login_invalid(self):
+        self.initialize_user()
+        request, response = self.post(async_views.login_view, reverse('auth:login'),
+                                      {'username': 'test_user', 'password': 'rrr'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(SESSION_KEY, request.session)
+        self.assertContains(response, 'Sorry, that login was invalid')
+
+    def test_login_failure_signal(self):
+        self.initialize_user()
+        receiver = mock.Mock()
+        user_login_failed.connect(receiver)
+        self.addCleanup(user_login_failed.disconnect, receiver)
+        self.post(async_views.login_view, reverse('auth:login'), {'username': 'test_user', 'password': 'rrr'})
+        self.assertEqual(receiver.call_count, 1)
+        self.assertEqual(receiver.call_args[1]['credentials']['username'], 'test_user')
+
+    def test_register(self):
+        threads = []
+        original_encode = PBKDF2PasswordHasher.encode
+
+        def encode(hasher, password, salt, iterations=None):
+            threads.append(threading.current_thread().name)
+            return original_encode(hasher, password, salt, iterations)
+
+        with mock.patch.object(PBKDF2PasswordHasher, 'encode', autospec=True, side_effect=encode):
+            request, response = self.post(async_views.register_view, reverse('auth:register'),
+                                          {'username': 'test', 'email': 'test@email.test',
+                                           'phone': '+5571981265131', 'password': 'secret',
+                                           'password2': 'secret'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(threads), 1)
+        self.assertTrue(threads[0].startswith('accounts'))
+        user = User.objects.get(username='test')
+        self.assertFalse(user.is_active)
+        self.assertTrue(user.check_password('secret'))
+
+    def test_activate(self):
+        user = self.initialize_user(is_active=False, email_verified=False)
+        uid = urlsafe_base64_encode(force_bytes(user.pk))
+        token = account_activation_token.make_token(user)
+        request = self.rf.get(reverse('auth:activate', args=[uid, token]))
+        self.process_requests(request)
+        response = async_to_sync(async_views.activate_view)(request, uid, token)
+        self.assertEqual(response.url, reverse('auth:profile'))
+        user.refresh_from_db()
+        self.assertTrue(user.is_active)
+        self.assertTrue(user.profile.email_verified)
@@ -1,8 +1,11 @@
 import os
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
 from django.test import Client, RequestFactory
 from django.http import HttpRequest
-from accounts.authentication import PhoneAuthBackend, UsernameAuthBackend,EmailAuthBackend
+from accounts.authentication import PhoneAuthBackend, UsernameAuthBackend,EmailAuthBackend, IdentifierAuthBackend
+from accounts.utils import assign_permissions
 from .utils import AccountsTestCase
 User = get_user_model()
 
@@ -57,3 +60,99 @@ class TestAuthBackends(AccountsTestCase):
                 EmailAuthBackend.authenticate(self, request,
                                               username='testuser@test.com', password='rrr')
                 )
+
+    def test_identifier_backend(self):
+        backend = IdentifierAuthBackend()
+        request = HttpRequest()
+        for identifier in ['test_user', 'testuser@test.com', '+16469061833', '+1 646 906 1833']:
+            with self.assertNumQueries(1):
+                user = backend.authenticate(request, username=identifier, password='rrrr')
+            self.assertEqual(user, self.user)
+            with self.assertNumQueries(0):
+                self.assertTrue(user.profile.email_verified)
+        self.assertIsNone(backend.authenticate(request, username='test_use', password='rrrr'))
+        self.assertIsNone(backend.authenticate(request, username='+16469061834', password='rrrr'))
+        self.assertIsNone(backend.authenticate(request, username='test_user', password='rrr'))
+        self.assertIsNone(backend.get_user(None))
+
+    def test_email_lookup_is_case_insensitive(self):
+        self.assertEqual(self.user.email_lookup, 'testuser@test.com')
+        self.assertEqual(EmailAuthBackend().authenticate(None, username=' TestUser@Test.com', password='rrrr'),
+                         self.user)
+        self.assertEqual(IdentifierAuthBackend().authenticate(None, username='TESTUSER@test.com', password='rrrr'),
+                         self.user)
+        self.user.email = 'Changed@Test.com'
+        self.user.save(update_fields=['email'])
+        self.assertTrue(User.objects.filter(email_lookup='changed@test.com').exists())
+
+    def test_identifier_backend_username_lookalikes(self):
+        other = self.initialize_user(username='+16469061833', email='other@test.com', phone='+16469061844')
+        at_user = self.initialize_user(username='at@user', email='at@test.com', phone='+16469061855')
+        backend = IdentifierAuthBackend()
+        self.assertEqual(backend.authenticate(None, username='+16469061833', password='rrrr'), self.user)
+        self.assertEqual(backend.authenticate(None, username='+16469061844', password='rrrr'), other)
+        self.assertEqual(backend.authenticate(None, username='at@user', password='rrrr'), at_user)
+
+    def test_identifier_backend_shared_email(self):
+        # a username looking like the shared e-mail, created after both owners
+        self.initialize_user(username='Second@test.com', email='Testuser@Test.com', phone='+16469061844')
+        self.initialize_user(username='testuser@test.com', email='third@test.com', phone='+16469061855')
+        backend = IdentifierAuthBackend()
+        for _ in range(3):
+            self.assertEqual(backend.authenticate(None, username='testuser@test.com', password='rrrr'), self.user)
+        self.assertEqual(EmailAuthBackend().authenticate(None, username='testuser@test.com', password='rrrr'),
+                         self.user)
+
+
+class TestCachedUser(AccountsTestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = self.initialize_user()
+        self.backend = IdentifierAuthBackend()
+
+    def test_get_user_is_cached_with_profile(self):
+        with self.assertNumQueries(1):
+            self.backend.get_user(self.user.pk)
+        with self.assertNumQueries(0):
+            user = self.backend.get_user(self.user.pk)
+            self.assertTrue(user.profile.email_verified)
+        self.assertIsNone(self.backend.get_user(self.user.pk + 100))
+
+    def test_saves_invalidate_cached_user(self):
+        self.backend.get_user(self.user.pk)
+        self.user.profile.phone_verified = True
+        self.user.profile.save()
+        with self.assertNumQueries(1):
+            self.assertTrue(self.backend.get_user(self.user.pk).profile.phone_verified)
+        self.user.first_name = 'cached'
+        self.user.save()
+        self.assertEqual(self.backend.get_user(self.user.pk).first_name, 'cached')
+
+    def test_permission_changes_invalidate_cached_user(self):
+        group = assign_permissions('support', full_access_apps=['accounts'])
+        self.backend.get_user(self.user.pk)
+        self.user.groups.add(group)
+        with self.assertNumQueries(1):
+            self.backend.get_user(self.user.pk)
+        with self.captureOnCommitCallbacks() as callbacks:
+            assign_permissions('support', full_access_apps=['auth'])
+        # kept until the permissions are committed
+        with self.assertNumQueries(0):
+            self.backend.get_user(self.user.pk)
+        for callback in callbacks:
+            callback()
+        with self.assertNumQueries(1):
+            self.backend.get_user(self.user.pk)
+
+    def test_group_permission_changes_invalidate_cached_user(self):
+        group = Group.objects.create(name='support')
+        self.user.groups.add(group)
+        permission = Permission.objects.get(codename='view_device')
+        changes = [lambda: group.permissions.add(permission), lambda: permission.group_set.remove(group),
+                   lambda: permission.group_set.add(group), lambda: permission.group_set.clear(),
+                   lambda: group.permissions.set([permission]), lambda: group.permissions.clear()]
+        for change in changes:
+            self.backend.get_user(self.user.pk)
+            change()
+            with self.assertNumQueries(1):
+                self.backend.get_user(self.user.pk)
@@ -0,0 +1,77 @@
+from unittest import mock
+
+from django.test import RequestFactory
+from geoip2.errors import AddressNotFoundError
+
+from accounts import device_generator
+from accounts.device_generator import get_location, lookup_location, UNKNOWN_LOCATION
+from .utils import AccountsTestCase
+
+
+class GeoLocationTest(AccountsTestCase):
+    def setUp(self):
+        self.rf = RequestFactory()
+        self.geoip = mock.Mock()
+        self.geoip.city.return_value = {'city': 'Boston', 'country_name': 'United States'}
+        device_generator._city_location.cache_clear()
+        self.addCleanup(device_generator._city_location.cache_clear)
+        patcher = mock.patch.object(device_generator, '_geoip', self.geoip)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_lookup_is_cached_per_subnet(self):
+        self.assertEqual(lookup_location('8.8.4.1'), 'Boston, United States')
+        self.assertEqual(lookup_location('8.8.4.200'), 'Boston, United States')
+        self.geoip.city.assert_called_once_with('8.8.4.0')
+        lookup_location('2001:db8:1:2::1')
+        self.geoip.city.assert_called_with('2001:db8:1::')
+        self.assertEqual(device_generator.location_cache_info().hits, 1)
+
+    def test_unknown_addresses(self):
+        self.geoip.city.side_effect = AddressNotFoundError('not found')
+        self.assertEqual(lookup_location('10.0.0.1'), UNKNOWN_LOCATION)
+        self.assertEqual(lookup_location('not-an-ip'), UNKNOWN_LOCATION)
+        self.assertEqual(lookup_location(''), UNKNOWN_LOCATION)
+        self.assertEqual(self.geoip.city.call_count, 1)
+
+    def test_get_location_uses_forwarded_ip(self):
+        request = self.rf.get('/', HTTP_X_FORWARDED_FOR='8.8.8.8, 10.0.0.1')
+        self.assertEqual(get_location(request), 'Boston, United States')
+        self.geoip.city.assert_called_once_with('8.8.8.0')
+
+    def test_missing_database(self):
+        with mock.patch.object(device_generator, '_geoip', None), \
+                mock.patch.object(device_generator, 'GeoIP2',
+                                  side_effect=device_generator.GeoIP2Exception('missing')) as geoip2:
+            self.assertIsNone(device_generator.get_geoip())
+            self.assertIsNone(device_generator.get_geoip())
+            self.assertEqual(lookup_location('8.8.8.8'), UNKNOWN_LOCATION)
+        geoip2.assert_called_once()
+
+
+class UserAgentTest(AccountsTestCase):
+    ua = ('Mozilla/5.0 (iPhone; CPU iPhone OS 14_2 like Mac OS X) AppleWebKit/605.1.15 '
+          '(KHTML, like Gecko) Version/14.0 Mobile/15E148 Safari/604.1')
+
+    def setUp(self):
+        self.rf = RequestFactory()
+        device_generator.parse_device_signature.cache_clear()
+
+    def test_signature_is_memoized(self):
+        request = self.rf.get('/', HTTP_USER_AGENT=self.ua)
+        with mock.patch.object(device_generator, 'parse', wraps=device_generator.parse) as parse:
+            device_generator.parse_user_agent.cache_clear()
+            first = device_generator.get_device_signature(request)
+            second = device_generator.get_device_signature(request)
+        self.assertIs(first, second)
+        self.assertEqual(parse.call_count, 1)
+        self.assertEqual(first.browser, 'Mobile Safari 14.0')
+        self.assertEqual(first.operating_system, 'iOS 14.2')
+        info = device_generator.user_agent_cache_info()
+        self.assertEqual((info.hits, info.misses), (1, 1))
+
+    def test_missing_user_agent(self):
+        signature = device_generator.get_device_signature(self.rf.get('/'))
+        self.assertEqual(signature.browser, 'Other')
+        self.assertIs(device_generator.get_user_agent(self.rf.get('/')),
+                      device_generator.parse_user_agent('Unknown-device'))
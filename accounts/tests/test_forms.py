@@ -1,10 +1,16 @@
 
 import django
+from unittest import mock
+
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
 from django.contrib.auth import get_user_model
+from django.core.cache import caches
 from django.test import override_settings, TestCase, Client, RequestFactory
 from django.urls import reverse
+from accounts import otp
 from accounts.forms import UserRegistrationForm, LoginForm, TokenVerificationForm, PhoneVerificationForm
 from accounts.views import verify_phone, activate_phone
+from accounts.otp import store_code
 from accounts.verification import Verificator
 from twilio.base.exceptions import TwilioRestException
 
@@ -42,6 +48,18 @@ class TestLoginForms(AccountsTestCase):
         self.assertFalse(form.is_valid())
         self.assertWarnsMessage('Please verify your email', form.errors.as_json())
 
+    def test_login_form_authenticates_once(self):
+        user = self.initialize_user()
+        request = self.rf.post(reverse('auth:login'))
+        form = LoginForm(data={'username': 'test_user', 'password': 'rrrr'}, request=request)
+        with mock.patch.object(PBKDF2PasswordHasher, 'verify', autospec=True,
+                               side_effect=PBKDF2PasswordHasher.verify) as verify:
+            with self.assertNumQueries(1):
+                self.assertTrue(form.is_valid())
+                self.assertEqual(form.get_user(), user)
+                self.assertEqual(form.login(request), user)
+        self.assertEqual(verify.call_count, 1)
+
     def test_login_invalid(self):
         self.initialize_user()
         form = LoginForm(data={'username': 'test_user', 'password': 'rrr'})
@@ -70,10 +88,10 @@ class TestPhoneActivationForms(AccountsTestCase):
         self.assertTrue(form.is_valid())
         self.assertRedirects(response, reverse('auth:activate_phone'))
         user = User.objects.get(phone=form.cleaned_data['phone'])
-        self.assertTrue(user.profile.temp_token != '')
         session_phone = request.session.get('user_phone')
         self.assertEquals(user.phone, session_phone)
-        self.assertTrue(len(user.profile.temp_token), 4)
+        code_key, _ = otp._keys(session_phone)
+        self.assertEqual(len(caches[otp.CACHE_ALIAS].get(code_key)), 4)
 
     def test_phone_verification_form_fails(self):
         form = PhoneVerificationForm(data={'phone': '+16469061922'})
@@ -82,8 +100,7 @@ class TestPhoneActivationForms(AccountsTestCase):
     def test_phone_verification_form_valid(self):
         user = self.initialize_user(phone='+5571981265131')
         self.client.force_login(user)
-        user.profile.temp_token = 1234
-        user.save()
+        store_code(user.phone, 1234)
         request = self.rf.post(reverse('auth:activate_phone'),
                                data={'token': 1234}, follow=True)
         self.process_requests(request)
@@ -92,11 +109,23 @@ class TestPhoneActivationForms(AccountsTestCase):
         response.client = self.client
         self.assertRedirects(response, reverse('auth:profile'))
 
+    def test_activate_phone_checks_token_once(self):
+        user = self.initialize_user(phone='+5571981265131')
+        store_code(user.phone, 1234)
+        request = self.rf.post(reverse('auth:activate_phone'), data={'token': 1234})
+        self.process_requests(request)
+        request.session['user_phone'] = str(user.phone)
+        original_check_token = Verificator.check_token
+        with mock.patch.object(Verificator, 'check_token', autospec=True,
+                               side_effect=original_check_token) as check_token:
+            response = activate_phone(request)
+        self.assertEqual(response.url, reverse('auth:profile'))
+        self.assertEqual(check_token.call_count, 1)
+
     def test_phone_verification_form_invalid_token(self):
         user = self.initialize_user(phone='+5571981265131')
         self.client.force_login(user)
-        user.profile.temp_token = 1234
-        user.save()
+        store_code(user.phone, 1234)
         request = self.rf.post(reverse('auth:activate_phone'),
                                data={'token': 1111}, follow=True)
         self.process_requests(request)
@@ -108,8 +137,7 @@ class TestPhoneActivationForms(AccountsTestCase):
     def test_phone_verification_form_expired_token(self):
         user = self.initialize_user(phone='+5571981265131')
         self.client.force_login(user)
-        user.profile.temp_token = 1234
-        user.save()
+        store_code(user.phone, 1234)
         request = self.rf.post(reverse('auth:activate_phone'),
                                data={'token': 1234}, follow=True)
         self.process_requests(request)
@@ -121,8 +149,7 @@ class TestPhoneActivationForms(AccountsTestCase):
     def test_phone_verification_form_invalid_request(self):
         user = self.initialize_user(phone='+5571981265131')
         self.client.force_login(user)
-        user.profile.temp_token = 1234
-        user.save()
+        store_code(user.phone, 1234)
         request = self.rf.post(reverse('auth:activate_phone'),
                                data={'tok': 1234}, follow=True)
         self.process_requests(request)
@@ -0,0 +1,107 @@
+import datetime
+from io import StringIO
+from smtplib import SMTPException
+from unittest import mock
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.mail import queue_email, send_queued, retry_delay
+from accounts.models import QueuedEmail
+from .utils import AccountsTestCase
+
+
+@override_settings(ACCOUNTS_EMAIL_QUEUE=True)
+class EmailQueueTest(AccountsTestCase):
+    def setUp(self):
+        self.client = Client(enforce_csrf_checks=False)
+
+    def test_registration_queues_activation_email(self):
+        self.client.post(reverse('auth:register'),
+                         data={'username': 'test', 'email': 'test@email.test',
+                               'phone': '+5571981265131', 'password': 'secret', 'password2': 'secret'})
+        self.assertEqual(len(mail.outbox), 0)
+        email = QueuedEmail.objects.get()
+        self.assertEqual(email.recipients, ['test@email.test'])
+        out = StringIO()
+        call_command('send_queued_mail', stdout=out)
+        self.assertIn('Sent 1 emails, 0 failed.', out.getvalue())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].alternatives[0][1], 'text/html')
+        email.refresh_from_db()
+        self.assertEqual(email.status, QueuedEmail.SENT)
+
+    def test_batch_reuses_one_connection(self):
+        for i in range(5):
+            queue_email('subject', 'body', ['user{}@test.com'.format(i)])
+        with mock.patch('accounts.mail.get_connection', wraps=mail.get_connection) as get_connection:
+            self.assertEqual(send_queued(batch_size=3), (3, 0))
+            self.assertEqual(send_queued(batch_size=3), (2, 0))
+            self.assertEqual(send_queued(batch_size=3), (0, 0))
+        self.assertEqual(get_connection.call_count, 2)
+        self.assertEqual(len(mail.outbox), 5)
+
+    def test_failed_send_is_retried_with_backoff(self):
+        email = queue_email('subject', 'body', ['user@test.com'])
+        with mock.patch('django.core.mail.EmailMultiAlternatives.send', side_effect=SMTPException('down')):
+            self.assertEqual(send_queued(), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual(email.attempts, 1)
+        self.assertEqual(email.status, QueuedEmail.QUEUED)
+        self.assertIn('down', email.last_error)
+        self.assertGreater(email.next_attempt_at, timezone.now() + datetime.timedelta(seconds=50))
+        # not due yet
+        self.assertEqual(send_queued(), (0, 0))
+        self.assertEqual(retry_delay(3), datetime.timedelta(minutes=4))
+        self.assertEqual(retry_delay(20), datetime.timedelta(hours=1))
+
+    def test_connection_lost_mid_batch_fails_the_rest(self):
+        emails = [queue_email('subject', 'body', ['user{}@test.com'.format(i)]) for i in range(4)]
+        send = mock.patch('django.core.mail.EmailMultiAlternatives.send',
+                          side_effect=[1, SMTPException('dropped')])
+        reopen = mock.patch('django.core.mail.backends.locmem.EmailBackend.open',
+                            side_effect=[None, SMTPException('refused')])
+        with send, reopen:
+            self.assertEqual(send_queued(), (1, 3))
+        for email in emails:
+            email.refresh_from_db()
+        self.assertEqual(emails[0].status, QueuedEmail.SENT)
+        self.assertIn('dropped', emails[1].last_error)
+        for email in emails[1:]:
+            self.assertEqual(email.attempts, 1)
+            self.assertEqual(email.status, QueuedEmail.QUEUED)
+        for email in emails[2:]:
+            self.assertIn('refused', email.last_error)
+
+    def test_connection_refused_fails_the_batch(self):
+        email = queue_email('subject', 'body', ['user@test.com'])
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.open',
+                        side_effect=SMTPException('refused')):
+            self.assertEqual(send_queued(), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual(email.attempts, 1)
+        self.assertIn('refused', email.last_error)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_gives_up_after_max_attempts(self):
+        email = queue_email('subject', 'body', ['user@test.com'])
+        QueuedEmail.objects.filter(pk=email.pk).update(attempts=4)
+        with mock.patch('django.core.mail.EmailMultiAlternatives.send', side_effect=SMTPException('down')):
+            send_queued()
+        email.refresh_from_db()
+        self.assertEqual(email.status, QueuedEmail.FAILED)
+
+    def test_claimed_emails_are_leased(self):
+        queue_email('subject', 'body', ['user@test.com'])
+        from accounts.mail import claim_batch
+        self.assertEqual(len(claim_batch()), 1)
+        self.assertEqual(len(claim_batch()), 0)
+
+    @override_settings(ACCOUNTS_EMAIL_QUEUE=False)
+    def test_queue_disabled_sends_immediately(self):
+        self.assertIsNone(queue_email('subject', 'body', ['user@test.com']))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertFalse(QueuedEmail.objects.exists())
@@ -1,6 +1,8 @@
+from unittest import mock
+
 from django.apps import apps
 from django.contrib.auth import get_user_model
-from django.test import override_settings, Client
+from django.test import override_settings, Client, RequestFactory
 from django.urls import reverse
 from accounts.forms import LoginForm
 from accounts.models import Device
@@ -47,6 +49,24 @@ class TestAccounts(AccountsTestCase):
         self.assertEquals(device.get_absolute_url(), reverse('auth:new_device'))
         self.assertEquals(device.__str__(), 'Mac from 127.0.0.1 - USA')
 
+    @mock.patch('accounts.models.get_location', return_value='Unknown-IP-Location')
+    def test_check_device_signature_single_query(self, get_location):
+        user = self.initialize_user()
+        Device.objects.bulk_create([
+            Device(user=user, machine='Mac', browser='Chrome', operating_system='OS',
+                   ip='10.0.{}.{}'.format(i // 250, i % 250), location='USA')
+            for i in range(300)
+        ])
+        request = RequestFactory().get('/', REMOTE_ADDR='10.0.1.7')
+        request.user = user
+        with self.assertNumQueries(1):
+            self.assertFalse(Device().check_device_signature(request, user))
+        request = RequestFactory().get('/', REMOTE_ADDR='192.0.2.1')
+        request.user = user
+        new_device = Device().check_device_signature(request, user)
+        self.assertEqual(new_device.ip, '192.0.2.1')
+        self.assertEqual(Device.objects.filter(user=user).count(), 301)
+
 
 class AccountsConfigTest(AccountsTestCase):
     def test_apps(self):
@@ -0,0 +1,79 @@
+from unittest import mock
+
+from django.core.cache import caches
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts import otp, sms
+from accounts.otp import check_code, discard_code, store_code
+from .utils import AccountsTestCase
+
+PHONE = '+18704945574'
+
+
+class OtpStoreTest(AccountsTestCase):
+    def setUp(self):
+        caches[otp.CACHE_ALIAS].clear()
+
+    def test_check_does_not_consume(self):
+        store_code(PHONE, 1234)
+        self.assertTrue(check_code(PHONE, '1234'))
+        self.assertTrue(check_code(PHONE, 1234))
+        discard_code(PHONE)
+        self.assertFalse(check_code(PHONE, '1234'))
+
+    def test_missing_code(self):
+        self.assertFalse(check_code(PHONE, '1234'))
+
+    def test_max_attempts_drop_code(self):
+        store_code(PHONE, 1234)
+        for _ in range(otp.MAX_ATTEMPTS):
+            self.assertFalse(check_code(PHONE, '0000'))
+        self.assertFalse(check_code(PHONE, '1234'))
+
+    def test_concurrent_guesses_are_counted_before_compare(self):
+        store_code(PHONE, 1234)
+        compares = []
+        original = otp.constant_time_compare
+
+        def compare(stored, guess):
+            compares.append(guess)
+            if len(compares) < otp.MAX_ATTEMPTS * 3:
+                # another guess arrives while this one is being compared
+                check_code(PHONE, '0000')
+            return original(stored, guess)
+
+        with mock.patch.object(otp, 'constant_time_compare', side_effect=compare):
+            self.assertFalse(check_code(PHONE, '0000'))
+        self.assertEqual(len(compares), otp.MAX_ATTEMPTS)
+        self.assertFalse(check_code(PHONE, '1234'))
+
+    def test_new_code_resets_attempts(self):
+        store_code(PHONE, 1234)
+        for _ in range(otp.MAX_ATTEMPTS - 1):
+            check_code(PHONE, '0000')
+        store_code(PHONE, 4321)
+        self.assertFalse(check_code(PHONE, '0000'))
+        self.assertTrue(check_code(PHONE, '4321'))
+
+    def test_expiry(self):
+        with mock.patch.object(otp, 'OTP_TIMEOUT', -1):
+            store_code(PHONE, 1234)
+        self.assertFalse(check_code(PHONE, '1234'))
+
+    @override_settings(ACCOUNTS_SMS_BACKEND='accounts.sms.backends.locmem.SmsBackend')
+    def test_verify_and_activate_without_profile_writes(self):
+        sms.outbox = []
+        user = self.initialize_user(phone=PHONE)
+        client = Client()
+        with CaptureQueriesContext(connection) as queries:
+            client.post(reverse('auth:verify_phone'), data={'phone': PHONE})
+        self.assertFalse([q for q in queries if 'UPDATE "accounts_profile"' in q['sql']])
+        code = sms.outbox[0].body.rsplit(' ', 1)[-1]
+        response = client.post(reverse('auth:activate_phone'), data={'token': code})
+        self.assertRedirects(response, reverse('auth:profile'), fetch_redirect_response=False)
+        user.profile.refresh_from_db()
+        self.assertTrue(user.profile.phone_verified)
+        self.assertFalse(check_code(PHONE, code))
@@ -0,0 +1,88 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import Group, Permission
+from django.core.management import call_command
+from django.test import override_settings
+
+from accounts.utils import assign_permissions
+from .utils import AccountsTestCase
+
+
+def codenames(group):
+    return set(group.permissions.values_list('content_type__app_label', 'codename'))
+
+
+class AssignPermissionsTest(AccountsTestCase):
+    def test_semantics(self):
+        group = assign_permissions(
+            'support',
+            ltd_access_apps=[{'auth': ['delete']}, {'sessions.session': ['add', 'change']}],
+            full_access_apps=['accounts'],
+            restricted_models=['accounts.activity', 'accounts.device.delete'],
+        )
+        perms = codenames(group)
+        self.assertIn(('accounts', 'change_device'), perms)
+        self.assertNotIn(('accounts', 'delete_device'), perms)
+        self.assertFalse([codename for app, codename in perms if codename.endswith('_activity')])
+        self.assertIn(('auth', 'add_group'), perms)
+        self.assertNotIn(('auth', 'delete_group'), perms)
+        self.assertEqual({codename for app, codename in perms if app == 'sessions'},
+                         {'delete_session', 'view_session'})
+
+    def test_only_differences_are_written(self):
+        group = assign_permissions('support', full_access_apps=['accounts'])
+        before = set(Group.permissions.through.objects.filter(group=group).values_list('pk', flat=True))
+        with self.assertNumQueries(3):
+            # group, permissions and the current set, nothing to write
+            assign_permissions('support', full_access_apps=['accounts'])
+        group = assign_permissions('support', full_access_apps=['accounts'], restricted_models=['accounts.device'])
+        after = set(Group.permissions.through.objects.filter(group=group).values_list('pk', flat=True))
+        # untouched rows keep their ids
+        self.assertTrue(after < before)
+        self.assertEqual(len(before - after), Permission.objects.filter(content_type__model='device').count())
+
+
+class SyncPermissionsCommandTest(AccountsTestCase):
+    config = {
+        'support': {'full_access_apps': ['accounts'], 'restricted_models': ['accounts.activity']},
+        'auditors': {'ltd_access_apps': [{'accounts': ['add', 'change', 'delete']}]},
+    }
+
+    def test_settings(self):
+        stdout = StringIO()
+        with override_settings(ACCOUNTS_GROUP_PERMISSIONS=self.config):
+            call_command('sync_permissions', stdout=stdout)
+            self.assertIn('auditors:', stdout.getvalue())
+            self.assertTrue(all(codename.startswith('view_')
+                                for _, codename in codenames(Group.objects.get(name='auditors'))))
+            call_command('sync_permissions', stdout=stdout)
+        self.assertIn('support: 0 added, 0 removed.', stdout.getvalue())
+
+    def test_file_and_dry_run(self):
+        handle, path = tempfile.mkstemp(suffix='.json')
+        self.addCleanup(os.remove, path)
+        with os.fdopen(handle, 'w') as stream:
+            json.dump(self.config, stream)
+        stdout = StringIO()
+        call_command('sync_permissions', file=path, dry_run=True, stdout=stdout)
+        self.assertFalse(Group.objects.exists())
+        self.assertIn('support:', stdout.getvalue())
+        call_command('sync_permissions', file=path, stdout=stdout)
+        self.assertTrue(codenames(Group.objects.get(name='support')))
+
+    @mock.patch('accounts.utils.invalidate_users')
+    def test_cached_users_dropped_after_commit(self, invalidate_users):
+        group = Group.objects.create(name='support')
+        user = self.initialize_user()
+        user.groups.add(group)
+        with override_settings(ACCOUNTS_GROUP_PERMISSIONS=self.config):
+            with self.captureOnCommitCallbacks() as callbacks:
+                call_command('sync_permissions', stdout=StringIO())
+        invalidate_users.assert_not_called()
+        for callback in callbacks:
+            callback()
+        self.assertEqual([list(call[0][0]) for call in invalidate_users.call_args_list], [[user.pk], []])
@@ -0,0 +1,95 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.cache import cache
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from accounts.ratelimit import (BaseRateLimitBackend, CacheRateLimitBackend, LocMemRateLimitBackend,
+                                parse_rate, reset_ratelimits, is_rate_limited)
+from .utils import AccountsTestCase
+
+
+class RateLimitBackendsTest(AccountsTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('10/m'), (10, 60))
+        self.assertEqual(parse_rate('5/15m'), (5, 900))
+        self.assertEqual(parse_rate('100/h'), (100, 3600))
+
+    def test_locmem_backend_sliding_window(self):
+        backend = LocMemRateLimitBackend()
+        with mock.patch('accounts.ratelimit.time.monotonic', return_value=100):
+            self.assertTrue(backend.hit('key', 2, 60))
+            self.assertTrue(backend.hit('key', 2, 60))
+            self.assertFalse(backend.hit('key', 2, 60))
+            self.assertTrue(backend.hit('other', 2, 60))
+        with mock.patch('accounts.ratelimit.time.monotonic', return_value=161):
+            self.assertTrue(backend.hit('key', 2, 60))
+
+    def test_cache_backend_sliding_window(self):
+        backend = CacheRateLimitBackend()
+        with mock.patch('accounts.ratelimit.time.time', return_value=6000):
+            self.assertTrue(backend.hit('key', 2, 60))
+            self.assertTrue(backend.hit('key', 2, 60))
+            self.assertFalse(backend.hit('key', 2, 60))
+        # half of the previous window still weighs in
+        with mock.patch('accounts.ratelimit.time.time', return_value=6090):
+            self.assertTrue(backend.hit('key', 2, 60))
+            self.assertFalse(backend.hit('key', 2, 60))
+        with mock.patch('accounts.ratelimit.time.time', return_value=6200):
+            self.assertTrue(backend.hit('key', 2, 60))
+
+    def test_cache_backend_concurrent_hits(self):
+        backend = CacheRateLimitBackend()
+        with mock.patch('accounts.ratelimit.time.time', return_value=6000):
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                allowed = list(executor.map(lambda _: backend.hit('key', 5, 60), range(40)))
+        self.assertEqual(allowed.count(True), 5)
+
+    def test_backend_must_implement_hit(self):
+        with self.assertRaises(TypeError):
+            BaseRateLimitBackend()
+
+    @override_settings(ACCOUNTS_RATELIMIT_ENABLE=False)
+    def test_disabled(self):
+        for _ in range(50):
+            self.assertFalse(is_rate_limited('login', '127.0.0.1', 'test_user'))
+
+
+@override_settings(ACCOUNTS_RATELIMITS={'login': {'ip': '5/m', 'identifier': '2/m'},
+                                        'verify_phone': {'ip': '5/m', 'identifier': '2/m'}})
+class RateLimitedViewsTest(AccountsTestCase):
+    def setUp(self):
+        reset_ratelimits()
+        self.client = Client(enforce_csrf_checks=False)
+
+    def test_login_rejected_before_hashing(self):
+        self.initialize_user()
+        data = {'username': 'test_user', 'password': 'wrong'}
+        for _ in range(2):
+            self.assertEqual(self.client.post(reverse('auth:login'), data=data).status_code, 200)
+        with mock.patch.object(PBKDF2PasswordHasher, 'verify') as verify:
+            with self.assertNumQueries(0):
+                response = self.client.post(reverse('auth:login'), data={'username': ' Test_User', 'password': 'x'})
+        self.assertEqual(response.status_code, 429)
+        verify.assert_not_called()
+        # another identifier from the same ip until the ip rate is hit
+        for _ in range(2):
+            response = self.client.post(reverse('auth:login'), data={'username': 'other', 'password': 'x'})
+            self.assertEqual(response.status_code, 200)
+        response = self.client.post(reverse('auth:login'), data={'username': 'another', 'password': 'x'})
+        self.assertEqual(response.status_code, 429)
+
+    def test_get_is_not_counted(self):
+        for _ in range(10):
+            self.assertEqual(self.client.get(reverse('auth:login')).status_code, 200)
+
+    def test_verify_phone_normalizes_identifier(self):
+        for phone in ['+18704945566', '+1 870 494 5566']:
+            self.assertEqual(self.client.post(reverse('auth:verify_phone'), data={'phone': phone}).status_code, 200)
+        response = self.client.post(reverse('auth:verify_phone'), data={'phone': '+1 (870) 494-5566'})
+        self.assertEqual(response.status_code, 429)
@@ -0,0 +1,52 @@
+import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from accounts.models import Activity, ActivityRollup
+from accounts.rollup import daily_counts, rollup_activity
+from .utils import AccountsTestCase
+
+
+class ActivityRollupTest(AccountsTestCase):
+    def setUp(self):
+        self.user = self.initialize_user()
+        self.other = self.initialize_user(username='other', email='other@test.com', phone='+16469061834')
+        self.today = timezone.now()
+        self.yesterday = self.today - datetime.timedelta(days=1)
+
+    def record(self, user, verb, created):
+        return Activity.objects.create(user=user, verb=verb, created=created)
+
+    def counts(self):
+        return {(rollup.day, rollup.verb, rollup.user_id): rollup.count for rollup in ActivityRollup.objects.all()}
+
+    def test_incremental(self):
+        self.record(self.user, 'logged in', self.yesterday)
+        self.record(self.user, 'logged in', self.yesterday)
+        self.record(self.other, 'logged in', self.yesterday)
+        self.assertEqual(rollup_activity(lag=0), 3)
+        self.assertEqual(rollup_activity(lag=0), 0)
+
+        self.record(self.user, 'logged in', self.yesterday)
+        self.record(self.user, 'created account', self.today)
+        self.assertEqual(rollup_activity(batch_size=1, lag=0), 2)
+        day, yesterday = timezone.localdate(self.today), timezone.localdate(self.yesterday)
+        self.assertEqual(self.counts(), {
+            (yesterday, 'logged in', self.user.pk): 3,
+            (yesterday, 'logged in', self.other.pk): 1,
+            (day, 'created account', self.user.pk): 1,
+        })
+        self.assertEqual(list(daily_counts('logged in')), [{'day': yesterday, 'verb': 'logged in', 'total': 4}])
+
+    def test_recent_rows_wait_for_lag(self):
+        self.record(self.user, 'logged in', self.today)
+        self.assertEqual(rollup_activity(lag=60), 0)
+        self.assertEqual(rollup_activity(lag=0), 1)
+
+    def test_command(self):
+        self.record(self.user, 'logged in', self.yesterday)
+        stdout = StringIO()
+        call_command('rollup_activity', lag=0, stdout=stdout)
+        self.assertIn('Counted 1 activities.', stdout.getvalue())
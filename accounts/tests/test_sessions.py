@@ -0,0 +1,103 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import login, update_session_auth_hash
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import Client, RequestFactory
+from django.utils import timezone
+
+from accounts.models import UserSession
+from accounts.sessions import SessionIndexMiddleware, revoke_sessions
+from .utils import AccountsTestCase
+
+
+class UserSessionTest(AccountsTestCase):
+    def setUp(self):
+        self.user = self.initialize_user()
+        self.other = self.initialize_user(username='other', email='other@test.com', phone='+16469061834')
+
+    def login(self, user):
+        client = Client()
+        client.force_login(user)
+        return client
+
+    def test_login_and_logout_keep_index(self):
+        client = self.login(self.user)
+        session_key = client.session.session_key
+        self.assertEqual(list(self.user.session_keys.values_list('session_key', flat=True)), [session_key])
+        client.logout()
+        self.assertFalse(UserSession.objects.exists())
+
+    def test_revoke_in_batches(self):
+        clients = [self.login(self.user) for _ in range(3)]
+        other = self.login(self.other)
+        with self.assertNumQueries(6):
+            # per batch of 2 one index read, one session delete and one index delete
+            self.assertEqual(revoke_sessions([self.user.pk], batch_size=2), 3)
+        session_keys = [client.session.session_key for client in clients]
+        self.assertFalse(Session.objects.filter(session_key__in=session_keys).exists())
+        self.assertTrue(Session.objects.filter(session_key=other.session.session_key).exists())
+        self.assertEqual(UserSession.objects.get().user, self.other)
+
+    def test_revoke_chunks_user_ids(self):
+        self.login(self.user)
+        self.login(self.other)
+        self.assertEqual(revoke_sessions([self.user.pk, self.other.pk], batch_size=1), 2)
+        self.assertFalse(UserSession.objects.exists())
+
+    def handle(self, view, session_key):
+        request = RequestFactory().get('/')
+        request.COOKIES[settings.SESSION_COOKIE_NAME] = session_key
+        SessionIndexMiddleware(SessionMiddleware(view))(request)
+        return request.session.session_key
+
+    def index(self, user):
+        return list(user.session_keys.values_list('session_key', flat=True))
+
+    def test_cycled_key_is_indexed(self):
+        session_key = self.login(self.user).session.session_key
+
+        def change_password(request):
+            request.user = self.user
+            update_session_auth_hash(request, self.user)
+            return HttpResponse()
+
+        new_key = self.handle(change_password, session_key)
+        self.assertNotEqual(new_key, session_key)
+        self.assertEqual(self.index(self.user), [new_key])
+
+    def test_login_over_other_user_session_is_indexed(self):
+        session_key = self.login(self.other).session.session_key
+
+        def switch_user(request):
+            request.user = self.other
+            login(request, self.user, backend=settings.AUTHENTICATION_BACKENDS[0])
+            return HttpResponse()
+
+        new_key = self.handle(switch_user, session_key)
+        self.assertEqual(self.index(self.user), [new_key])
+        self.assertEqual(self.index(self.other), [])
+
+    def test_unchanged_key_costs_no_query(self):
+        session_key = self.login(self.user).session.session_key
+        with self.assertNumQueries(0):
+            self.handle(lambda request: HttpResponse(), session_key)
+
+    def test_prune_expired_sessions(self):
+        live, expired, deleted = [self.login(self.user).session.session_key for _ in range(3)]
+        Session.objects.filter(session_key=expired).update(expire_date=timezone.now() - timedelta(days=1))
+        Session.objects.filter(session_key=deleted).delete()
+        out = StringIO()
+        call_command('prune_user_sessions', '--batch-size=2', stdout=out)
+        self.assertIn('Pruned 2 session index rows.', out.getvalue())
+        self.assertEqual(self.index(self.user), [live])
+
+    def test_revoked_session_is_logged_out(self):
+        client = self.login(self.user)
+        revoke_sessions([self.user.pk])
+        response = client.get('/accounts/profile/')
+        self.assertEqual(response.status_code, 302)
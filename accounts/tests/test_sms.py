@@ -0,0 +1,99 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from django.test import Client, RequestFactory, override_settings
+from django.urls import reverse
+
+from accounts import sms
+from accounts.sms import SmsMessage, get_connection, send_mass_sms, send_sms
+from accounts.sms.backends import batching
+from accounts.sms.backends.batching import SmsBatcher
+from accounts.sms.backends.console import SmsBackend as ConsoleBackend
+from accounts.sms.backends.filebased import SmsBackend as FileBackend
+from accounts.sms.backends.locmem import SmsBackend as LocMemBackend
+from accounts.verification import Verificator
+from .utils import AccountsTestCase
+
+LOCMEM_BACKEND = 'accounts.sms.backends.locmem.SmsBackend'
+
+
+@override_settings(ACCOUNTS_SMS_BACKEND=LOCMEM_BACKEND)
+class SmsBackendTest(AccountsTestCase):
+    def setUp(self):
+        sms.outbox = []
+
+    def test_get_connection(self):
+        self.assertIsInstance(get_connection(), LocMemBackend)
+        self.assertIsInstance(get_connection('accounts.sms.backends.console.SmsBackend'), ConsoleBackend)
+
+    def test_send_sms(self):
+        self.assertEqual(send_sms('code 1234', '+18704945574', from_='+15005550006'), 1)
+        message, = sms.outbox
+        self.assertEqual((message.body, message.to, message.from_), ('code 1234', '+18704945574', '+15005550006'))
+
+    def test_send_mass_sms(self):
+        sent = send_mass_sms([('code 1', '+18704945574', None), ('code 2', '+18704945575', None)])
+        self.assertEqual(sent, 2)
+        self.assertEqual([message.to for message in sms.outbox], ['+18704945574', '+18704945575'])
+
+    def test_console(self):
+        stream = io.StringIO()
+        SmsMessage('code 1234', '+18704945574', connection=ConsoleBackend(stream=stream)).send()
+        self.assertIn('To: +18704945574', stream.getvalue())
+        self.assertIn('code 1234', stream.getvalue())
+
+    def test_filebased(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        send_mass_sms([('code 1', '+18704945574', None), ('code 2', '+18704945575', None)],
+                      connection=FileBackend(file_path=path))
+        filename, = os.listdir(path)
+        with open(os.path.join(path, filename)) as stream:
+            lines = [json.loads(line) for line in stream]
+        self.assertEqual([line['body'] for line in lines], ['code 1', 'code 2'])
+
+    def test_batching_flushes_on_size(self):
+        batcher = SmsBatcher(LOCMEM_BACKEND, batch_size=3, interval=60)
+        self.addCleanup(batcher.flush)
+        batcher.add([SmsMessage('code 1', '+18704945574'), SmsMessage('code 2', '+18704945575')])
+        self.assertEqual(sms.outbox, [])
+        batcher.add([SmsMessage('code 3', '+18704945576')])
+        self.assertEqual(len(sms.outbox), 3)
+        self.assertIsNone(batcher.timer)
+
+    def test_batching_flushes_on_interval(self):
+        batcher = SmsBatcher(LOCMEM_BACKEND, batch_size=10, interval=0.01)
+        batcher.add([SmsMessage('code 1', '+18704945574')])
+        batcher.timer.join(timeout=5)
+        self.assertEqual(len(sms.outbox), 1)
+
+    def test_batching_backend(self):
+        batcher = SmsBatcher(LOCMEM_BACKEND, batch_size=10, interval=60)
+        original = batching._batcher
+        batching._batcher = batcher
+        self.addCleanup(setattr, batching, '_batcher', original)
+        connection = get_connection('accounts.sms.backends.batching.SmsBackend')
+        self.assertEqual(send_sms('code 1234', '+18704945574', connection=connection), 1)
+        self.assertEqual(sms.outbox, [])
+        self.assertEqual(batcher.flush(), 1)
+        self.assertEqual(sms.outbox[0].body, 'code 1234')
+
+    def test_verify_phone_sends_through_backend(self):
+        self.initialize_user(phone='+18704945574')
+        response = Client().post(reverse('auth:verify_phone'), data={'phone': '+18704945574'})
+        self.assertRedirects(response, reverse('auth:activate_phone'), fetch_redirect_response=False)
+        message, = sms.outbox
+        self.assertEqual(message.to, '+18704945574')
+        self.assertIn('your code is', message.body)
+
+    @override_settings(ACCOUNTS_SMS_FROM='+15005550001', TWILIO_PHONE_NUMBER='+15005550006')
+    def test_verification_sender(self):
+        request = RequestFactory().get('/')
+        verificator = Verificator(request)
+        verificator.phone, verificator.token = '+18704945574', 1234
+        verificator.send_verification_sms()
+        Verificator(request, number='+15005550002').send_verification_sms()
+        self.assertEqual([message.from_ for message in sms.outbox], ['+15005550001', '+15005550002'])
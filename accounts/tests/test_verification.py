@@ -0,0 +1,70 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from django.test import Client, override_settings
+from django.urls import reverse
+from twilio.base.exceptions import TwilioRestException
+
+from accounts.sms.backends import twilio
+from accounts.sms.backends.twilio import SmsDispatcher, get_sms_client
+from .utils import AccountsTestCase
+
+
+class FakeTwilioHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        data = parse_qs(self.rfile.read(int(self.headers['Content-Length'])).decode())
+        self.server.requests.append((self.path, data, self.client_address[1]))
+        status, payload = (400, {'message': 'Invalid To', 'code': 21211}) \
+            if data['To'] == ['bad'] else (201, {'sid': 'SM1', 'to': data['To'][0]})
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class SmsDispatchTest(AccountsTestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeTwilioHandler)
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.dispatcher = SmsDispatcher('AC123', 'secret')
+        self.addCleanup(self.dispatcher.close)
+        self.dispatcher.api_url = 'http://127.0.0.1:{}/Accounts/{{}}/Messages.json'.format(self.server.server_port)
+
+    def test_shared_client(self):
+        self.assertIs(get_sms_client(), get_sms_client())
+
+    def test_dispatch_reuses_connection(self):
+        first = self.dispatcher.dispatch(to='+18704945574', from_='+15005550006', body='code 1234')
+        self.assertEqual(first.result(timeout=5)['sid'], 'SM1')
+        second = self.dispatcher.dispatch(to='+18704945575', from_='+15005550006', body='code 4321')
+        self.assertEqual(second.result(timeout=5)['to'], '+18704945575')
+        (path, data, port), (_, _, second_port) = self.server.requests
+        self.assertEqual(path, '/Accounts/AC123/Messages.json')
+        self.assertEqual(data['Body'], ['code 1234'])
+        self.assertEqual(port, second_port)
+
+    def test_dispatch_error(self):
+        future = self.dispatcher.dispatch(to='bad', from_='+15005550006', body='code 1234')
+        with self.assertRaises(TwilioRestException):
+            future.result(timeout=5)
+
+    @override_settings(ACCOUNTS_SMS_ASYNC=True)
+    def test_verify_phone_returns_once_enqueued(self):
+        self.initialize_user(phone='+18704945574')
+        original = twilio._dispatcher
+        twilio._dispatcher = self.dispatcher
+        self.addCleanup(setattr, twilio, '_dispatcher', original)
+        response = Client().post(reverse('auth:verify_phone'), data={'phone': '+18704945574'})
+        self.assertRedirects(response, reverse('auth:activate_phone'), fetch_redirect_response=False)
@@ -1,12 +1,21 @@
+import datetime
 import os
 import shutil
+from io import StringIO
+from unittest import mock
 
 from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.management import call_command
 from django.contrib.auth import get_user_model
-from django.test import Client, RequestFactory
+from django.db import connection
+from django.test import Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode
+from accounts.models import Activity
 from accounts.forms import UserEditForm, ProfileEditForm, PhoneVerificationForm, TrustedDeviceForm
 from accounts.views import verify_phone
 from accounts.views import RegisterView, ProfileEditView, LoginView
@@ -39,6 +48,15 @@ class UserTest(AccountsTestCase):
         self.assertRedirects(response, reverse('auth:profile'))
         self.assertTemplateUsed('accounts/profile.html')
 
+    @mock.patch('accounts.models.get_location', return_value='Unknown-IP-Location')
+    def test_login_view_hashes_password_once(self, get_location):
+        with mock.patch.object(PBKDF2PasswordHasher, 'verify', autospec=True,
+                               side_effect=PBKDF2PasswordHasher.verify) as verify:
+            response = self.client.post(reverse('auth:login'),
+                                        data={'username': 'test_user', 'password': 'rrrr'})
+        self.assertRedirects(response, reverse('auth:new_device'), fetch_redirect_response=False)
+        self.assertEqual(verify.call_count, 1)
+
     def test_login_invalid(self):
         response = self.client.post(reverse('auth:login'),
                                     data={'username': 'test_user', 'password': 'rrr'}, follow=True)
@@ -118,6 +136,7 @@ class RegistrationTest(AccountsTestCase):
         response = self.client.post(reverse('auth:password_reset'), data={'email': user.email}, follow=True)
         self.assertContains(response, 'We\'ve emailed you instructions for setting your password')
         self.assertRedirects(response, reverse('auth:password_reset_done'))
+        call_command('send_queued_mail', stdout=StringIO())
         url = re.findall('https?://[/-/_A-Za-z0-9/{4}].+', mail.outbox[0].body)
         reset_response = self.client.get(url[1][:-2], follow=True)
         self.assertContains(reset_response, 'New password')
@@ -218,3 +237,55 @@ class DeviceTest(AccountsTestCase):
         response = self.client.post(reverse('auth:new_device'),
                                     device_form.data, follow=True)
         self.assertRedirects(response, reverse('auth:profile'))
+
+
+@override_settings(ACCOUNTS_ACTIVITY_FEED_PAGE_SIZE=2)
+class ActivityFeedTest(AccountsTestCase):
+    def setUp(self):
+        self.user = self.initialize_user()
+        other = self.initialize_user(username='other', email='other@test.com', phone='+16469061834')
+        now = timezone.now()
+        # two share a timestamp so the id breaks the tie
+        for created in (now, now, now - datetime.timedelta(minutes=1), now - datetime.timedelta(minutes=2)):
+            Activity.objects.create(user=self.user, verb='verb', created=created)
+        Activity.objects.create(user=other, verb='other', created=now)
+        self.client.force_login(self.user)
+
+    def test_pages_follow_cursor(self):
+        expected = list(self.user.actions.order_by('-created', '-id').values_list('id', flat=True))
+        seen, url = [], reverse('auth:activity') + '?format=json'
+        while url:
+            data = self.client.get(url).json()
+            seen += [action['id'] for action in data['results']]
+            url = data['next']
+        self.assertEqual(seen, expected)
+
+    def test_html(self):
+        response = self.client.get(reverse('auth:activity'))
+        self.assertTemplateUsed(response, 'accounts/user/activity.html')
+        self.assertEqual(len(response.context['actions']), 2)
+        self.assertContains(response, 'Older activity')
+
+    def test_targets_prefetched(self):
+        url = reverse('auth:activity') + '?format=json'
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as untargeted:
+            self.client.get(url)
+        for username in ('first', 'second'):
+            target = self.initialize_user(username=username, email='{}@test.com'.format(username),
+                                          phone='+1646906{}'.format(1840 + len(username)))
+            Activity.objects.create(user=self.user, verb='followed', target=target)
+        with CaptureQueriesContext(connection) as targeted:
+            data = self.client.get(url).json()
+        self.assertEqual([action['target'] for action in data['results']], ['second', 'first'])
+        # one query for the users of the single target content type
+        self.assertEqual(len(targeted), len(untargeted) + 1)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('auth:activity'), {'cursor': 'bogus'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_login_required(self):
+        self.client.logout()
+        response = self.client.get(reverse('auth:activity'))
+        self.assertEqual(response.status_code, 302)
@@ -1,14 +1,40 @@
 import os
+from contextlib import contextmanager
 
 from django.contrib.auth import get_user_model
 from django.contrib.messages.middleware import MessageMiddleware
 from django.contrib.sessions.middleware import SessionMiddleware
-from django.test import TestCase
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import TestCase, TransactionTestCase
+
+from accounts.ratelimit import reset_ratelimits
 
 User = get_user_model()
 
 
-class AccountsTestCase(TestCase):
+class AccountsTestMixin(object):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        reset_ratelimits()
+
+    @classmethod
+    @contextmanager
+    def captureOnCommitCallbacks(cls, *, using=DEFAULT_DB_ALIAS, execute=False):
+        """
+        Backport of the Django 3.2 TestCase helper, collects the
+        transaction.on_commit callbacks registered in the block
+        """
+        callbacks = []
+        start_count = len(connections[using].run_on_commit)
+        try:
+            yield callbacks
+        finally:
+            callbacks[:] = [func for sids, func in connections[using].run_on_commit[start_count:]]
+            if execute:
+                for callback in callbacks:
+                    callback()
+
     @staticmethod
     def process_requests(req):
         middleware = SessionMiddleware()
@@ -47,3 +73,14 @@ class AccountsTestCase(TestCase):
         file.name = filename
         file.seek(0)
         return file
+
+
+class AccountsTestCase(AccountsTestMixin, TestCase):
+    pass
+
+
+class AccountsTransactionTestCase(AccountsTestMixin, TransactionTestCase):
+    """
+    For code reading the database from other threads, e.g. the async
+    views thread pool, which can't see a TestCase transaction
+    """
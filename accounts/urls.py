@@ -1,13 +1,26 @@
+from django.conf import settings
 from django.urls import path, include, re_path, reverse_lazy
 from django.contrib.auth import views as auth_views
 
 from . import views
+from .forms import QueuedPasswordResetForm
+
+if getattr(settings, 'ACCOUNTS_ASYNC_VIEWS', False):
+    from . import async_views
+    register_view = async_views.register_view
+    login_view = async_views.login_view
+    activate_view = async_views.activate_view
+else:
+    register_view = views.RegisterView.as_view()
+    login_view = views.LoginView.as_view()
+    activate_view = views.activate
 
 urlpatterns = [
-    path('register/', views.RegisterView.as_view(), name="register"),
-    path('login/', views.LoginView.as_view(), name='login'),
+    path('register/', register_view, name="register"),
+    path('login/', login_view, name='login'),
     path('password_reset/',
          auth_views.PasswordResetView.as_view(
+             form_class=QueuedPasswordResetForm,
              email_template_name='post_office/accounts/password_reset_email.html',
              html_email_template_name='post_office/accounts/password_reset_email.html',
              success_url=reverse_lazy('auth:password_reset_done')
@@ -31,8 +44,9 @@ urlpatterns = [
     path('edit/', views.ProfileEditView.as_view(), name='edit'),
     path('profile/', views.profile, name="profile"),
     path('profile/new_device/', views.alert_user, name="new_device"),
+    path('profile/activity/', views.activity_feed, name='activity'),
     re_path(r'^activate/(?P<uidb64>[0-9A-Za-z_\-]+)/(?P<token>[0-9A-Za-z]{1,13}-[0-9A-Za-z]{1,35})/$',
-            views.activate, name='activate'),
+            activate_view, name='activate'),
 
     path('request/activation/<int:pk>/', views.request_verification_email, name='verification_request'),
     path('phone/verify/', views.verify_phone, name='verify_phone'),
@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import transaction
+
+CACHE_ALIAS = getattr(settings, 'ACCOUNTS_USER_CACHE_ALIAS', 'default')
+CACHE_TIMEOUT = getattr(settings, 'ACCOUNTS_USER_CACHE_TIMEOUT', 300)
+KEY_PREFIX = 'accounts:user:'
+
+
+def _cache_key(user_id):
+    return '{}{}'.format(KEY_PREFIX, user_id)
+
+
+def get_cached_user(user_id):
+    """
+    Resolve the session user with its profile preloaded
+
+    :param user_id: primary key stored in the session
+    :returns user object or None
+    """
+    if user_id is None:
+        return None
+    cache = caches[CACHE_ALIAS]
+    key = _cache_key(user_id)
+    user = cache.get(key)
+    if user is None:
+        User = get_user_model()
+        try:
+            user = User.objects.select_related('profile').get(pk=user_id)
+        except (User.DoesNotExist, ValueError, TypeError):
+            return None
+        cache.set(key, user, CACHE_TIMEOUT)
+    return user
+
+
+def invalidate_users(user_ids):
+    """
+    Drop cached users, repeated once the surrounding transaction commits
+    so a concurrent request can't cache the rows being replaced.
+
+    :param user_ids: iterable of user primary keys
+    """
+    keys = [_cache_key(user_id) for user_id in user_ids]
+    if not keys:
+        return
+    cache = caches[CACHE_ALIAS]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_user(user_id):
+    invalidate_users([user_id])
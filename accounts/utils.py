@@ -1,15 +1,15 @@
 from django.contrib.auth.models import Permission, Group
-from django.contrib.contenttypes.models import ContentType
 from django.contrib.sites.shortcuts import get_current_site
+from django.db import transaction
 from django.db.models import ImageField
-import datetime
 
 from django.template.loader import render_to_string
-from django.utils import timezone
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode
+from phonenumber_field.phonenumber import PhoneNumber, to_python
 
 from .tokens import account_activation_token
+from .user_cache import invalidate_users
 
 # not used
 # def _set_upload_space():
@@ -27,6 +27,23 @@ class CustomImageField(ImageField):
         super(CustomImageField, self).save_form_data(instance, data)
 
 
+def email_lookup_value(email):
+    """
+    :returns case-folded email stored in and matched against User.email_lookup
+    """
+    return (email or '').strip().casefold()
+
+
+def phone_lookup_value(phone):
+    """
+    :returns canonical E.164 string of the phone or None when it doesn't parse
+    """
+    phone = to_python(phone)
+    if isinstance(phone, PhoneNumber) and phone.is_valid():
+        return phone.as_e164
+    return None
+
+
 def send_verification_email(request, user):
     current_site = get_current_site(request)
     subject = 'Activate Your {} Account'.format(current_site)
@@ -36,7 +53,8 @@ def send_verification_email(request, user):
         'uid': urlsafe_base64_encode(force_bytes(user.pk)),
         'token': account_activation_token.make_token(user),
     })
-    user.email_user(subject, message, html_message=message)
+    from .mail import queue_email
+    queue_email(subject, message, [user.email], html_message=message)
 
 
 def create_action(user, verb, target=None):
@@ -46,25 +64,10 @@ def create_action(user, verb, target=None):
     :param user: user object
     :param verb: string [create, change, delete, add]
     :param target: target model string defaults to None
-
+    :returns True if recorded, False if the same activity was recorded in the last minute
     """
-    now = timezone.now()
-    last_minute = now - datetime.timedelta(seconds=60)
-    from .models import Activity
-    similar_actions = Activity.objects.filter(user_id=user.id,
-                                              verb=verb,
-                                              created__gte=last_minute)
-    if target:
-        target_ct = ContentType.objects.get_for_model(target)
-        similar_actions = similar_actions.filter(target_ct=target_ct,
-                                                 target_id=target.id)
-
-    if not similar_actions:
-        # no existing actions found
-        activity = Activity(user=user, verb=verb, target=target)
-        activity.save()
-        return True
-    return False
+    from .activity import record_activity
+    return record_activity(user, verb, target)
 
 
 def assign_permissions(grp_name: str = 'owner_admin', ltd_access_apps: list = [],
@@ -100,39 +103,85 @@ def assign_permissions(grp_name: str = 'owner_admin', ltd_access_apps: list = []
 
     """
     owner_admin = Group.objects.get_or_create(name=grp_name)[0]
-    # start on clean group permissions
-    owner_admin.permissions.clear()
-    to_remove = set()
+    permission_ids = resolve_permissions(load_permissions(), ltd_access_apps, full_access_apps, restricted_models)
+    sync_group_permissions(owner_admin, permission_ids)
+    return owner_admin
+
+
+def load_permissions():
+    """
+    :returns list of all permissions with their content types, one query
+    """
+    return list(Permission.objects.select_related('content_type'))
+
+
+def resolve_permissions(permissions, ltd_access_apps=(), full_access_apps=(), restricted_models=()):
+    """
+    Work out in memory which of the loaded permissions the assign_permissions
+    arguments grant, privileges and restrictions match codenames
+    case-insensitively as substrings
+
+    :param permissions: list from load_permissions()
+    :returns set of permission ids
+    """
+    def matching(app_label, model=None, privilege=None):
+        return {
+            perm.pk for perm in permissions
+            if perm.content_type.app_label == app_label
+            and (model is None or perm.content_type.model == model)
+            and (privilege is None or privilege.lower() in perm.codename.lower())
+        }
+
     to_escalate = set()
+    to_remove = set()
     for _app in full_access_apps:
-        to_escalate.add(Permission.objects.filter(content_type__app_label=_app))
+        to_escalate |= matching(_app)
 
     for mod in restricted_models:
         try:
             """remove specific permission"""
             app_label, model, perm = mod.split('.')
-            to_remove.add(Permission.objects.filter(content_type__app_label=app_label,
-                                                    content_type__model=model, codename__icontains=perm))
+            to_remove |= matching(app_label, model, perm)
         except ValueError:
             """restrict the whole model"""
             app_label, model = mod.split('.', 1)
-            to_remove.add(Permission.objects.filter(content_type__app_label=app_label, content_type__model=model))
+            to_remove |= matching(app_label, model)
 
     for ltd_app_list in ltd_access_apps:
         app_label = list(ltd_app_list.keys())[0]
-        app_available_perms = Permission.objects.filter(
-                content_type__app_label=app_label)
+        model_name = None
         if '.' in app_label:
-            app_label, model_name = list(ltd_app_list.keys())[0].split('.', 1)
-            app_available_perms = Permission.objects.filter(
-                content_type__app_label=app_label, content_type__model=model_name)
+            app_label, model_name = app_label.split('.', 1)
+        app_available_perms = matching(app_label, model_name)
         for privilege in list(ltd_app_list.values())[0]:
-            app_available_perms = app_available_perms.exclude(codename__icontains=privilege)
+            app_available_perms -= matching(app_label, model_name, privilege)
+        to_escalate |= app_available_perms
 
-        to_escalate.add(app_available_perms)
+    return to_escalate - to_remove
 
-    for perm in list(to_escalate):
-        owner_admin.permissions.add(*perm)
-    for perm in list(to_remove):
-        owner_admin.permissions.remove(*perm)
-    return owner_admin
+
+def sync_group_permissions(group, permission_ids, current_ids=None):
+    """
+    Bring the group permissions to exactly permission_ids, only missing
+    rows are inserted and only extra rows deleted, both in bulk on the
+    through table so no m2m_changed signals are sent
+
+    :param current_ids: set of the group permission ids when already loaded
+    :returns tuple of (added, removed) counts
+    """
+    through = Group.permissions.through
+    if current_ids is None:
+        current_ids = set(through.objects.filter(group_id=group.pk).values_list('permission_id', flat=True))
+    to_add = set(permission_ids) - current_ids
+    to_delete = current_ids - set(permission_ids)
+    if not to_add and not to_delete:
+        return 0, 0
+    with transaction.atomic():
+        if to_delete:
+            through.objects.filter(group_id=group.pk, permission_id__in=to_delete).delete()
+        through.objects.bulk_create([through(group_id=group.pk, permission_id=pk) for pk in to_add],
+                                    ignore_conflicts=True)
+    # members are read and dropped from the cache once the outermost
+    # transaction commits, sync_permissions runs every group in one
+    transaction.on_commit(lambda: invalidate_users(group.user_set.values_list('pk', flat=True)))
+    return len(to_add), len(to_delete)
@@ -3,7 +3,8 @@ from django.contrib import messages
 from django.contrib.auth import login, get_user_model
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import HttpResponseRedirect
+from django.db.models import prefetch_related_objects
+from django.http import HttpResponseRedirect, HttpResponseBadRequest, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse
 from django.utils.decorators import method_decorator
@@ -12,10 +13,12 @@ from django.utils.http import urlsafe_base64_decode
 from django.views.generic.base import View
 from twilio.base.exceptions import TwilioRestException
 
-from .decorators import auth_guest
+from .decorators import auth_guest, ratelimit, posted_identifier, posted_phone
 from .forms import UserEditForm, ProfileEditForm, LoginForm, UserRegistrationForm, TrustedDeviceForm, \
     TokenVerificationForm, PhoneVerificationForm
 from .models import Device
+from .otp import discard_code
+from .pagination import keyset_page
 from .tokens import account_activation_token
 from .utils import send_verification_email, create_action
 from .verification import Verificator
@@ -76,30 +79,42 @@ class LoginView(View):
     def get(self, request, *args, **kwargs):
         return render(request, self.template_name, {'form': self.form})
 
+    @method_decorator(ratelimit('login', identifier=posted_identifier('username')))
     def post(self, request, *args, **kwargs):
-        form = self.form(request.POST)
+        form = self.form(request.POST, request=request)
         if form.is_valid():
-            user = form.login(request)
-            if user:
-                login(request, user)
-                """
-                catch device request and manipulate it
-                """
-                new_device = Device().check_device_signature(request, user)
-                if new_device:
-                    request.session['new_device_id'] = new_device.id
-                    request.session.set_expiry(300)
-                    # fire an email
-                    new_device.notify_user(request, new_device)
-                    return redirect('auth:new_device')
-
-                messages.success(request, 'Welcome back {}'.format(user.username))
-                create_action(user, 'logged in', user)
+            user = form.get_user()
+            new_device = self.login_user(request, user)
+            if new_device:
+                # fire an email
+                new_device.notify_user(request, new_device)
+                return redirect('auth:new_device')
 
             return redirect(request.POST.get('next') or 'auth:profile')
         else:
             return render(request, self.template_name, {'form': form})
 
+    @staticmethod
+    def login_user(request, user):
+        """
+        Logs in the verified user and catches a device change
+
+        :returns the new device object or None
+        """
+        login(request, user)
+        """
+        catch device request and manipulate it
+        """
+        new_device = Device().check_device_signature(request, user)
+        if new_device:
+            request.session['new_device_id'] = new_device.id
+            request.session.set_expiry(300)
+            return new_device
+
+        messages.success(request, 'Welcome back {}'.format(user.username))
+        create_action(user, 'logged in', user)
+        return None
+
 
 class ProfileEditView(LoginRequiredMixin, View):
     user_form = UserEditForm
@@ -134,6 +149,35 @@ def profile(request):
     return render(request, 'accounts/profile.html')
 
 
+@login_required
+def activity_feed(request):
+    """
+    Activities of the logged in user, newest first, paginated by cursor.
+    Answers JSON for ?format=json or an Accept: application/json request
+    """
+    per_page = getattr(settings, 'ACCOUNTS_ACTIVITY_FEED_PAGE_SIZE', 20)
+    try:
+        actions, cursor = keyset_page(request.user.actions.all(), request.GET.get('cursor'), per_page)
+    except ValueError:
+        return HttpResponseBadRequest('Invalid cursor')
+    prefetch_related_objects(actions, 'target')
+
+    next_url = '{}?cursor={}'.format(reverse('auth:activity'), cursor) if cursor else None
+    if request.GET.get('format') == 'json' or 'application/json' in request.headers.get('Accept', ''):
+        return JsonResponse({
+            'results': [{
+                'id': action.pk,
+                'verb': action.verb,
+                'target': str(action.target) if action.target_id else None,
+                'created': action.created,
+            } for action in actions],
+            'next': next_url and next_url + '&format=json',
+            'cursor': cursor,
+        })
+    return render(request, 'accounts/user/activity.html', {'actions': actions, 'next_url': next_url})
+
+
+@ratelimit('verification_email', identifier=lambda request, **kwargs: kwargs.get('pk'), methods=('GET', 'POST'))
 def request_verification_email(request, **kwargs):
     user = User.objects.get(pk=kwargs.get('pk'))
     send_verification_email(request, user)
@@ -167,16 +211,14 @@ def activate_phone(request):
     if request.method == 'POST':
         token_form = TokenVerificationForm(request, request.POST)
         if token_form.is_valid():
-            verificator = Verificator(request)
-            verificator.verify()
-            user = verificator.check_token()
+            user = token_form.get_user()
 
             user.profile.phone_verified = True
 
-            user.profile.temp_token = ''
-
             user.profile.save()
 
+            discard_code(request.session['user_phone'])
+
             login(request, user, backend='django.contrib.auth.backends.ModelBackend')
 
             messages.success(request, 'Thanks! %s Your phone is verified.' % user.username,
@@ -198,30 +240,24 @@ def user_detail(request, username):
     return render(request, 'accounts/user/detail.html', {'user': user})
 
 
+@ratelimit('verify_phone', identifier=posted_phone)
 def verify_phone(request):
     if request.method == 'POST':
         verification_form = PhoneVerificationForm(request.POST)
         if verification_form.is_valid():
-            user_phone = verification_form.cleaned_data['phone']
+            # looked up once by the form's clean_phone
+            user = verification_form.user
+            verificator = Verificator(request)
             try:
-                user = User.objects.get(phone=user_phone)
-                verificator = Verificator(request)
-                try:
-                    verificator.process_verification_request(user)
-                except (Exception, TwilioRestException):
-                    messages.warning(request, 'Technical error encountered, please try again.')
-                    return redirect('auth:verify_phone')
-
-                user.profile.temp_token = verificator.token
-                user.profile.save()
-
-                messages.success(request, 'Verification code sent.')
-                create_action(user, 'Requested phone verification')
+                verificator.process_verification_request(user)
+            except (Exception, TwilioRestException):
+                messages.warning(request, 'Technical error encountered, please try again.')
+                return redirect('auth:verify_phone')
 
-                return redirect(request.POST.get('next') or 'auth:activate_phone')
+            messages.success(request, 'Verification code sent.')
+            create_action(user, 'Requested phone verification')
 
-            except User.DoesNotExist:
-                user = None
+            return redirect(request.POST.get('next') or 'auth:activate_phone')
     else:
         if request.user.is_authenticated:
             verification_form = PhoneVerificationForm(instance=request.user)
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+# serve the accounts async views, wsgi keeps the sync ones
+os.environ.setdefault('ACCOUNTS_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
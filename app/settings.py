@@ -42,6 +42,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'accounts.sessions.SessionIndexMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -125,12 +126,16 @@ AUTH_USER_MODEL = 'accounts.User'
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 MEDIA_URL = '/media/'
 AUTHENTICATION_BACKENDS = [
-    'accounts.authentication.EmailAuthBackend',
-    'accounts.authentication.PhoneAuthBackend',
-    'accounts.authentication.UsernameAuthBackend',
+    'accounts.authentication.IdentifierAuthBackend',
 ]
 
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+# emails are delivered by `manage.py send_queued_mail`
+ACCOUNTS_EMAIL_QUEUE = True
+
+# set by app/asgi.py, hashing and smtp run in a bounded thread pool
+ACCOUNTS_ASYNC_VIEWS = os.environ.get('ACCOUNTS_ASYNC_VIEWS') == '1'
+ACCOUNTS_ASYNC_MAX_WORKERS = 4
 
 # maxmind db follow https://docs.djangoproject.com/en/3.1/ref/contrib/gis/geoip2/
 GEOIP_PATH = os.path.join(BASE_DIR, '../GeoLite')